@@ -1,7 +1,8 @@
 import logging
 from array import array
+from collections import deque
 from enum import Enum
-from typing import NamedTuple, Tuple
+from typing import NamedTuple, Optional, Tuple
 
 
 logger = logging.getLogger(__name__)
@@ -60,57 +61,95 @@ class Instruction(NamedTuple):
         return self.modes[n - 1]
 
 
+class Tracer:
+    """
+    The last instructions executed, such as ("ADD", pc, src1, src2, dst),
+    also logged at DEBUG level unless logger is None
+    """
+
+    def __init__(self, maxlen=10_000, logger=logger):
+        self.events = deque(maxlen=maxlen)
+        self.logger = logger
+
+    def __call__(self, *event):
+        self.events.append(event)
+        if self.logger is not None and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(" ".join(str(field) for field in event))
+
+
+def test_tracer():
+    tracer = Tracer(maxlen=2)
+    computer = IntcodeComputer("1,0,0,0,99", input_callback=None, tracer=tracer)
+    list(computer.run())
+    assert computer.memory[0] == 2
+    assert list(tracer.events) == [("ADD", 0, 1, 1, 0), ("HALT", 4)]
+
+
 SIGNED_LONG = "l"
 
 
 class IntcodeComputer:
-    def __init__(self, program, input_callback, memory_size=1024 * 1024):
+    def __init__(
+        self,
+        program,
+        input_callback,
+        memory_size=1024 * 1024,
+        tracer: Optional[Tracer] = None,
+    ):
         self.memory = array(SIGNED_LONG, [int(n) for n in program.split(",")])
         self.memory.extend([0] * (memory_size - len(self.memory)))
         self.pc = 0
         self.relative_base = 0
         self.input_callback = input_callback
+        self.tracer = tracer
 
     def run(self):
+        trace = self.tracer
         while True:
-            logger.debug("PC = %s", self.pc)
             instruction = Instruction.decode(self.memory[self.pc])
 
             if instruction.opcode == Opcode.HALT.value:
-                logger.debug("HALT")
+                if trace:
+                    trace("HALT", self.pc)
                 break
 
             elif instruction.opcode == Opcode.ADD.value:
                 src1 = self.read_operand(instruction, 1)
                 src2 = self.read_operand(instruction, 2)
                 dst = self.get_effective_address(instruction, 3)
-                logger.debug("ADD %s, %s -> %s", src1, src2, dst)
+                if trace:
+                    trace("ADD", self.pc, src1, src2, dst)
                 self.memory[dst] = src1 + src2
 
             elif instruction.opcode == Opcode.MUL.value:
                 src1 = self.read_operand(instruction, 1)
                 src2 = self.read_operand(instruction, 2)
                 dst = self.get_effective_address(instruction, 3)
-                logger.debug("MUL %s, %s -> %s", src1, src2, dst)
+                if trace:
+                    trace("MUL", self.pc, src1, src2, dst)
                 self.memory[dst] = src1 * src2
 
             elif instruction.opcode == Opcode.INPUT.value:
                 dst = self.get_effective_address(instruction, 1)
-                logger.debug("INPUT -> %s", dst)
+                if trace:
+                    trace("INPUT", self.pc, dst)
                 value = self.input_callback()
-                logger.debug(f"(received {value})")
+                if trace:
+                    trace("RECEIVED", self.pc, value)
                 assert value is not None
                 self.memory[dst] = value
 
             elif instruction.opcode == Opcode.OUTPUT.value:
                 value = self.read_operand(instruction, 1)
-                logger.debug("OUTPUT %s", value)
+                if trace:
+                    trace("OUTPUT", self.pc, value)
                 yield value
 
             elif instruction.opcode == Opcode.JUMP_IF_TRUE.value:
                 condition = self.read_operand(instruction, 1)
                 target = self.read_operand(instruction, 2)
-                logger.debug("JUMP_IF_TRUE %s -> %s", condition, target)
+                if trace:
+                    trace("JUMP_IF_TRUE", self.pc, condition, target)
                 if condition != 0:
                     self.pc = target
                     continue
@@ -118,7 +157,8 @@ class IntcodeComputer:
             elif instruction.opcode == Opcode.JUMP_IF_FALSE.value:
                 condition = self.read_operand(instruction, 1)
                 target = self.read_operand(instruction, 2)
-                logger.debug("JUMP_IF_FALSE %s -> %s", condition, target)
+                if trace:
+                    trace("JUMP_IF_FALSE", self.pc, condition, target)
                 if condition == 0:
                     self.pc = target
                     continue
@@ -127,19 +167,22 @@ class IntcodeComputer:
                 src1 = self.read_operand(instruction, 1)
                 src2 = self.read_operand(instruction, 2)
                 dst = self.get_effective_address(instruction, 3)
-                logger.debug("LT %s, %s -> %s", src1, src2, dst)
+                if trace:
+                    trace("LT", self.pc, src1, src2, dst)
                 self.memory[dst] = 1 if src1 < src2 else 0
 
             elif instruction.opcode == Opcode.EQ.value:
                 src1 = self.read_operand(instruction, 1)
                 src2 = self.read_operand(instruction, 2)
                 dst = self.get_effective_address(instruction, 3)
-                logger.debug("EQ %s, %s -> %s", src1, src2, dst)
+                if trace:
+                    trace("EQ", self.pc, src1, src2, dst)
                 self.memory[dst] = 1 if src1 == src2 else 0
 
             elif instruction.opcode == Opcode.OFFSET_REL_BASE.value:
                 offset = self.read_operand(instruction, 1)
-                logger.debug("OFFSET_REL_BASE %s", offset)
+                if trace:
+                    trace("OFFSET_REL_BASE", self.pc, offset)
                 self.relative_base += offset
 
             else:
@@ -1,5 +1,11 @@
 # https://adventofcode.com/2022/day/6
 
+from __future__ import annotations
+
+from functools import partial
+from io import StringIO
+from typing import Iterable, TextIO
+
 from more_itertools import windowed
 
 import pytest
@@ -21,7 +27,7 @@ def test_part1(signal, result):
 
 
 def part1(text: str) -> int:
-    return find_sequence_of_different_chars(text, 4)
+    return find_markers([text], [4])[4]
 
 
 def find_sequence_of_different_chars(text: str, length: int) -> int:
@@ -31,6 +37,40 @@ def find_sequence_of_different_chars(text: str, length: int) -> int:
     raise KeyError
 
 
+@pytest.mark.parametrize("chunk_size", [1, 3, 4096])
+def test_find_markers(chunk_size):
+    signal = "nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg"
+    chunks = read_chunks(StringIO(signal), chunk_size)
+    assert find_markers(chunks, [4, 14, 40]) == {4: 10, 14: 29}
+
+
+def find_markers(chunks: Iterable[str], lengths: Iterable[int]) -> dict[int, int]:
+    """
+    Find the end of the first sequence of each length of different chars, in
+    a single pass over the chunks. The last index of each char gives, in O(1),
+    the start of the longest sequence of different chars ending at the
+    current index: all markers shorter than it are found.
+    """
+    pending = sorted(set(lengths))
+    markers: dict[int, int] = {}
+    last_seen: dict[str, int] = {}
+    start = index = 0
+    for chunk in chunks:
+        for char in chunk:
+            start = max(start, last_seen.get(char, -1) + 1)
+            last_seen[char] = index
+            index += 1
+            while pending and index - start >= pending[0]:
+                markers[pending.pop(0)] = index
+            if not pending:
+                return markers
+    return markers
+
+
+def read_chunks(f: TextIO, size: int = 1 << 16) -> Iterable[str]:
+    return iter(partial(f.read, size), "")
+
+
 # === Part 2 ===
 
 
@@ -49,7 +89,7 @@ def test_part2(signal, result):
 
 
 def part2(text: str) -> int:
-    return find_sequence_of_different_chars(text, 14)
+    return find_markers([text], [14])[14]
 
 
 def read_puzzle_input() -> str:
@@ -58,6 +98,7 @@ def read_puzzle_input() -> str:
 
 
 if __name__ == "__main__":
-    text = read_puzzle_input()
-    print("Part 1:", part1(text))
-    print("Part 2:", part2(text))
+    with open(__file__.removesuffix("py") + "txt") as f:
+        markers = find_markers(read_chunks(f), [4, 14])
+    print("Part 1:", markers[4])
+    print("Part 2:", markers[14])
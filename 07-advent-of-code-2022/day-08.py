@@ -6,6 +6,7 @@ from itertools import takewhile
 from typing import Generator
 
 from more_itertools import ilen, split_after
+import numpy as np
 
 
 EXAMPLE_INPUT = """\
@@ -25,8 +26,7 @@ def test_part1():
 
 
 def part1(text: str) -> int:
-    grid = Grid.from_string(text)
-    return len(list(grid.visible_trees()))
+    return int(HeightMap.from_string(text).visible().sum())
 
 
 class Grid:
@@ -126,6 +126,68 @@ class Grid:
         )
 
 
+def test_height_map_visible():
+    grid = Grid.from_string(EXAMPLE_INPUT)
+    height_map = HeightMap.from_string(EXAMPLE_INPUT)
+    visible = height_map.visible()
+    assert {(x, y) for y, x in zip(*np.nonzero(visible))} == set(grid.visible_trees())
+
+
+class HeightMap:
+    """
+    Tree heights in a NumPy array, for computing visibility and viewing
+    distances of all trees in O(width * height), one direction at a time.
+    Grid is the (slower) reference implementation.
+    """
+
+    def __init__(self, heights: np.ndarray):
+        self.heights = heights
+
+    @classmethod
+    def from_string(cls, text: str) -> HeightMap:
+        lines = text.split()
+        digits = np.frombuffer("".join(lines).encode(), dtype=np.uint8) - ord("0")
+        return cls(heights=digits.reshape(len(lines), len(lines[0])))
+
+    @staticmethod
+    def views(array: np.ndarray) -> list:
+        """
+        The array seen from the left, right, top and bottom, so that each
+        direction can be handled as looking from the start of each row
+        """
+        return [array, array[:, ::-1], array.T, array.T[:, ::-1]]
+
+    def visible(self) -> np.ndarray:
+        res = np.zeros(self.heights.shape, dtype=bool)
+        for heights, visible in zip(self.views(self.heights), self.views(res)):
+            highest_before = np.full(heights.shape, -1, dtype=np.int16)
+            highest_before[:, 1:] = np.maximum.accumulate(heights, axis=1)[:, :-1]
+            visible |= heights > highest_before
+        return res
+
+    def scenic_scores(self) -> np.ndarray:
+        res = np.ones(self.heights.shape, dtype=np.int64)
+        for heights, scores in zip(self.views(self.heights), self.views(res)):
+            scores *= viewing_distances_to_the_start(heights)
+        return res
+
+
+def viewing_distances_to_the_start(heights: np.ndarray) -> np.ndarray:
+    """
+    For each tree, count the trees it can see towards the start of its row,
+    using a stack of the trees that are not hidden yet (decreasing heights).
+    """
+    res = np.zeros(heights.shape, dtype=np.int64)
+    for y, row in enumerate(heights.tolist()):
+        stack: list[int] = []
+        for x, height in enumerate(row):
+            while stack and row[stack[-1]] < height:
+                stack.pop()
+            res[y, x] = x - stack[-1] if stack else x
+            stack.append(x)
+    return res
+
+
 # === Part 2 ===
 
 
@@ -141,9 +203,16 @@ def test_viewing_distance():
     assert grid.scenic_score(2, 3) == 8
 
 
+def test_height_map_scenic_scores():
+    grid = Grid.from_string(EXAMPLE_INPUT)
+    scores = HeightMap.from_string(EXAMPLE_INPUT).scenic_scores()
+    assert scores.tolist() == [
+        [grid.scenic_score(x, y) for x in range(grid.width)] for y in range(grid.height)
+    ]
+
+
 def part2(text: str) -> int:
-    grid = Grid.from_string(text)
-    return grid.highest_scenic_score()
+    return int(HeightMap.from_string(text).scenic_scores().max())
 
 
 def read_puzzle_input() -> str:
@@ -2,11 +2,13 @@
 
 from collections import Counter, deque
 from functools import reduce
-from typing import Iterable, List
-import logging
+from math import lcm
+from textwrap import dedent
+from typing import Dict, Iterable, List, Optional, Tuple
 import operator
 import re
 
+import numpy as np
 import pytest
 
 
@@ -129,9 +131,7 @@ def test_item(value):
 
 
 def part1(text: str) -> int:
-    monkeys = [
-        Monkey.from_string(paragraph) for paragraph in text.split("\n\n") if paragraph
-    ]
+    monkeys = parse_monkeys(text)
     return level_of_monkey_business(monkeys, rounds=20)
 
 
@@ -209,48 +209,279 @@ def test_parse_monkey():
     assert monkey.dest_if_false == 3
 
 
+def parse_monkeys(text: str) -> List[Monkey]:
+    return [
+        Monkey.from_string(paragraph) for paragraph in text.split("\n\n") if paragraph
+    ]
+
+
 def level_of_monkey_business(monkeys, rounds):
     counts = total_number_of_times_each_monkey_inspects_items(monkeys, rounds)
+    return monkey_business(counts)
+
+
+def monkey_business(counts: Counter) -> int:
     (_, n1), (_, n2) = counts.most_common(2)
     return n1 * n2
 
 
+def test_tracer():
+    monkeys = parse_monkeys(EXAMPLE_INPUT)
+    tracer = Tracer(maxlen=3)
+    total_number_of_times_each_monkey_inspects_items(monkeys, rounds=1, tracer=tracer)
+    assert list(tracer.events) == [
+        ("inspect", 3, 3139),
+        ("throw", 3, 1046, 1),
+        ("end of round", 1),
+    ]
+
+
+class Tracer:
+    """
+    The last "inspect", "throw" and "end of round" events of a simulation
+    """
+
+    def __init__(self, maxlen: int = 10_000):
+        self.events: deque = deque(maxlen=maxlen)
+
+    def __call__(self, *event) -> None:
+        self.events.append(event)
+
+
 def total_number_of_times_each_monkey_inspects_items(
-    monkeys: List[Monkey], rounds: int
+    monkeys: List[Monkey], rounds: int, tracer: Optional[Tracer] = None
 ):
     counter: Counter = Counter()
     for round in range(rounds):
-        logging.debug(f"Round {round + 1}")
         for monkey in monkeys:
-            logging.debug(f"Monkey {monkey.number}")
             while monkey.items:
                 counter[monkey.number] += 1
                 item = monkey.items.popleft()
-                logging.debug(
-                    f"  Monkey inspects an item with a worry level of {item}."
-                )
                 item.update_worry_level(monkey.operator, monkey.operand)
-                logging.debug(f"    Worry level is {monkey.operator} {monkey.operand} to {item}.")
+                if tracer:
+                    tracer("inspect", monkey.number, item.worry_level)
                 item.decrease_worry_level()
-                logging.debug(
-                    f"    Monkey gets bored with item. Worry level is divided by 3 to {item}."
-                )
                 divisible = item.is_divisible_by(monkey.divisor)
-                logging.debug(
-                    f"    Current worry level {'is' if divisible else 'is not'} divisible by {monkey.divisor}."
-                )
                 dest = monkey.dest_if_true if divisible else monkey.dest_if_false
                 monkeys[dest].items.append(item)
-                logging.debug(
-                    f"    Item with worry level {item} is thrown to monkey {dest}."
-                )
-        for monkey in monkeys:
-            logging.debug(
-                f"Monkey {monkey.number}: {', '.join(map(str, monkey.items))}"
-            )
+                if tracer:
+                    tracer("throw", monkey.number, item.worry_level, dest)
+        if tracer:
+            tracer("end of round", round + 1)
     return counter
 
 
+def test_inspection_counts():
+    monkeys = parse_monkeys(EXAMPLE_INPUT)
+    assert inspection_counts(monkeys, rounds=20) == Counter(
+        {0: 101, 1: 95, 2: 7, 3: 105}
+    )
+    assert inspection_counts(monkeys, rounds=20) == (
+        total_number_of_times_each_monkey_inspects_items(monkeys, rounds=20)
+    )
+
+
+@pytest.mark.parametrize(
+    "rounds,counts",
+    [
+        (1, [2, 4, 3, 6]),
+        (20, [99, 97, 8, 103]),
+        (1000, [5204, 4792, 199, 5192]),
+        (10_000, [52166, 47830, 1938, 52013]),
+    ],
+)
+def test_inspection_counts_without_relief(rounds, counts):
+    monkeys = parse_monkeys(EXAMPLE_INPUT)
+    assert inspection_counts(monkeys, rounds, relief=False) == Counter(
+        dict(enumerate(counts))
+    )
+
+
+def inspection_counts(
+    monkeys: List[Monkey], rounds: int, relief: bool = True
+) -> Counter:
+    """
+    Same as total_number_of_times_each_monkey_inspects_items, but worry levels
+    are plain integers, and without relief they are kept modulo the product of
+    all divisors (which preserves all divisibility tests). Monkeys are not
+    modified.
+    """
+    modulus = lcm(*(monkey.divisor for monkey in monkeys))
+    queues = [deque(item.worry_level for item in monkey.items) for monkey in monkeys]
+    counter: Counter = Counter()
+    for _ in range(rounds):
+        for monkey, queue in zip(monkeys, queues):
+            counter[monkey.number] += len(queue)
+            square = monkey.operand == "old"
+            operand = 0 if square else int(monkey.operand)
+            while queue:
+                worry_level = queue.popleft()
+                if monkey.operator == "+":
+                    worry_level += operand
+                elif square:
+                    worry_level *= worry_level
+                else:
+                    worry_level *= operand
+                if relief:
+                    worry_level //= 3
+                else:
+                    worry_level %= modulus
+                if worry_level % monkey.divisor == 0:
+                    queues[monkey.dest_if_true].append(worry_level)
+                else:
+                    queues[monkey.dest_if_false].append(worry_level)
+    return counter
+
+
+@pytest.mark.parametrize("rounds", [0, 1, 20, 1000, 10_000])
+def test_inspection_counts_from_item_cycles(rounds):
+    monkeys = parse_monkeys(EXAMPLE_INPUT)
+    assert inspection_counts_from_item_cycles(monkeys, rounds) == (
+        inspection_counts(monkeys, rounds, relief=False)
+    )
+
+
+def inspection_counts_from_item_cycles(monkeys: List[Monkey], rounds: int) -> Counter:
+    """
+    Without relief, items never interact, and the state of each item at the
+    start of a round (its monkey and its worry level modulo the product of all
+    divisors) eventually repeats. All items are simulated together, round by
+    round, until each one has gone through its cycle, then the inspection
+    counts are extrapolated to any number of rounds.
+    """
+    modulus = lcm(*(monkey.divisor for monkey in monkeys))
+    owners = np.array(
+        [monkey.number for monkey in monkeys for _ in monkey.items], dtype=np.int64
+    )
+    worry_levels = np.array(
+        [item.worry_level % modulus for monkey in monkeys for item in monkey.items],
+        dtype=worry_level_dtype(monkeys, modulus),
+    )
+    nb_items = len(owners)
+
+    seen: List[Dict[int, int]] = [{} for _ in range(nb_items)]
+    cycles: List[Optional[Tuple[int, int]]] = [None] * nb_items  # (start, period)
+    history: List[np.ndarray] = []  # inspections per item and per monkey per round
+    while len(history) < rounds and None in cycles:
+        states = [
+            owner * modulus + worry_level
+            for owner, worry_level in zip(owners.tolist(), worry_levels.tolist())
+        ]
+        for i, state in enumerate(states):
+            if cycles[i] is None:
+                if state in seen[i]:
+                    start = seen[i][state]
+                    cycles[i] = (start, len(history) - start)
+                else:
+                    seen[i][state] = len(history)
+        history.append(simulate_round(monkeys, owners, worry_levels, modulus))
+
+    inspections = np.zeros((nb_items, len(monkeys)), dtype=np.int64)
+    if history:
+        counts = np.array(history)  # (rounds, items, monkeys)
+        for i, cycle in enumerate(cycles):
+            if cycle is None:  # no need to extrapolate
+                inspections[i] = counts[:rounds, i].sum(axis=0)
+                continue
+            start, period = cycle
+            nb_cycles, remainder = divmod(rounds - start, period)
+            inspections[i] = (
+                counts[:start, i].sum(axis=0)
+                + nb_cycles * counts[start : start + period, i].sum(axis=0)
+                + counts[start : start + remainder, i].sum(axis=0)
+            )
+    return Counter(
+        {
+            monkey.number: int(total)
+            for monkey, total in zip(monkeys, inspections.sum(axis=0))
+        }
+    )
+
+
+def test_simulate_round_with_large_divisors():
+    monkeys = parse_monkeys(
+        dedent(
+            """\
+            Monkey 0:
+              Starting items: 79
+              Operation: new = old * old
+              Test: divisible by 65521
+                If true: throw to monkey 1
+                If false: throw to monkey 1
+
+            Monkey 1:
+              Starting items: 98
+              Operation: new = old + 1
+              Test: divisible by 65519
+                If true: throw to monkey 0
+                If false: throw to monkey 0
+            """
+        )
+    )
+    modulus = 65521 * 65519
+    assert worry_level_dtype(monkeys, modulus) == object
+    owners = np.array([0, 1])
+    worry_levels = np.array([modulus - 1, 98], dtype=object)
+    simulate_round(monkeys, owners, worry_levels, modulus)
+    assert worry_levels.tolist() == [2, 99]  # (modulus - 1) ** 2 + 1 == 2 (mod)
+    assert inspection_counts_from_item_cycles(monkeys, rounds=1000) == (
+        inspection_counts(monkeys, rounds=1000, relief=False)
+    )
+
+
+def worry_level_dtype(monkeys: List[Monkey], modulus: int) -> np.dtype:
+    """
+    int64 if worry levels (below modulus) can be updated without overflowing
+    64-bit integers, otherwise Python integers (much slower)
+    """
+    max_operand = max(
+        [int(monkey.operand) for monkey in monkeys if monkey.operand != "old"],
+        default=0,
+    )
+    if modulus**2 < 2**63 and modulus * max(max_operand, 1) < 2**63:
+        return np.dtype(np.int64)
+    return np.dtype(object)
+
+
+def simulate_round(
+    monkeys: List[Monkey], owners: np.ndarray, worry_levels: np.ndarray, modulus: int
+) -> np.ndarray:
+    """
+    Simulate one round (without relief) for all items at once, updating their
+    owners and worry levels in place, and return the number of inspections per
+    item and per monkey. Worry levels must use worry_level_dtype.
+    """
+    inspections = np.zeros((len(owners), len(monkeys)), dtype=np.int64)
+    for monkey in monkeys:
+        held = owners == monkey.number
+        inspections[held, monkey.number] += 1
+        values = worry_levels[held]
+        if monkey.operator == "+":
+            values += int(monkey.operand)
+        elif monkey.operand == "old":
+            values *= values
+        else:
+            values *= int(monkey.operand)
+        values %= modulus
+        worry_levels[held] = values
+        owners[held] = np.where(
+            values % monkey.divisor == 0, monkey.dest_if_true, monkey.dest_if_false
+        )
+    return inspections
+
+
+# === Part 2 ===
+
+
+def test_part2():
+    assert part2(EXAMPLE_INPUT) == 2713310158
+
+
+def part2(text: str) -> int:
+    monkeys = parse_monkeys(text)
+    return monkey_business(inspection_counts_from_item_cycles(monkeys, rounds=10_000))
+
+
 def read_puzzle_input() -> str:
     with open(__file__.removesuffix("py") + "txt") as f:
         return f.read()
@@ -259,3 +490,4 @@ def read_puzzle_input() -> str:
 if __name__ == "__main__":
     text = read_puzzle_input()
     print("Part 1:", part1(text))
+    print("Part 2:", part2(text))
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from typing import Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+import pytest
+
+
+T = TypeVar("T")
+
+
+def naive_cycle(initial: int, step: Callable[[int], int]) -> tuple[int, int]:
+    seen = {}
+    index = 0
+    state = initial
+    while state not in seen:
+        seen[state] = index
+        state = step(state)
+        index += 1
+    return seen[state], index - seen[state]
+
+
+@pytest.mark.parametrize("initial", [0, 1, 2, 3, 42])
+@pytest.mark.parametrize("modulo", [1, 7, 255, 1009])
+def test_find_cycle(initial, modulo):
+    def step(x: int) -> int:
+        return (x * x + 1) % modulo
+
+    cycle = find_cycle(initial, step)
+    assert (cycle.start, cycle.period) == naive_cycle(initial, step)
+
+
+def test_find_cycle_with_key():
+    # Only the last item matters for the next state
+    def step(state: tuple[int, int]) -> tuple[int, int]:
+        return (state[0] + 1, (state[1] * 3) % 10)
+
+    cycle = find_cycle((0, 1), step, key=lambda state: state[1])
+    assert (cycle.start, cycle.period) == (0, 4)
+
+
+def test_find_cycle_with_fingerprint():
+    def step(x: int) -> int:
+        return (x * x + 1) % 1009
+
+    # A poor fingerprint must not produce false positives
+    cycle = find_cycle(0, step, fingerprint=lambda x: x % 3)
+    assert (cycle.start, cycle.period) == naive_cycle(0, step)
+
+
+def test_state_at():
+    def step(x: int) -> int:
+        return (x * x + 1) % 255
+
+    cycle = find_cycle(3, step)
+    state = 3
+    for index in range(200):
+        assert cycle.state_at(index) == state
+        state = step(state)
+
+
+@pytest.mark.parametrize("target", [0, 2, 5, 6, 7, 1000, 1001, 1002])
+def test_state_at_target(target):
+    nb_steps = 0
+
+    def step(x: int) -> int:
+        nonlocal nb_steps
+        nb_steps += 1
+        return (x * x + 1) % 255
+
+    expected = 3
+    for _ in range(target):
+        expected = step(expected)
+    cycle = find_cycle(3, step, target=target)
+    nb_steps = 0
+    assert cycle.state_at(target) == expected
+    assert nb_steps == 0
+
+
+@pytest.mark.parametrize("initial", [0, 1, 2, 3, 42])
+def test_find_cycle_keeping_states(initial):
+    nb_steps = 0
+
+    def step(x: int) -> int:
+        nonlocal nb_steps
+        nb_steps += 1
+        return (x * x + 1) % 1009
+
+    start, period = naive_cycle(initial, step)
+    nb_steps = 0
+    cycle = find_cycle(initial, step, fingerprint=lambda x: x % 3)
+    assert (cycle.start, cycle.period) == (start, period)
+    assert nb_steps == start + period
+    nb_steps = 0
+    state = initial
+    for index in range(200):
+        assert cycle.state_at(index) == state
+        state = (state * state + 1) % 1009
+    assert nb_steps == 0
+
+
+@dataclass(frozen=True)
+class Cycle(Generic[T]):
+    """
+    The sequence initial, step(initial), step(step(initial))... enters a
+    cycle of length period after a prefix of length start.
+    """
+
+    start: int
+    period: int
+    initial: T
+    first: T  # state at index start
+    step: Callable[[T], T]
+    known: Dict[int, T] = field(default_factory=dict)  # other states, by index
+
+    def state_at(self, index: int) -> T:
+        """
+        State at the given index. It is replayed (at most start + period - 1
+        steps) from the closest earlier state known by the cycle, if it is not
+        known itself.
+
+        With a custom key, states are only known up to their key: after the
+        prefix, the result is the state at an index of the first period of the
+        cycle (start <= index < start + period), so the fields that are not
+        part of the key do not match the ones at the given index.
+        """
+        if index >= self.start:
+            index = self.start + (index - self.start) % self.period
+        known = {0: self.initial, self.start: self.first, **self.known}
+        base = max(i for i in known if i <= index)
+        state = known[base]
+        for _ in range(index - base):
+            state = self.step(state)
+        return state
+
+
+def find_cycle(
+    initial: T,
+    step: Callable[[T], T],
+    key: Callable[[T], Hashable] = lambda state: state,
+    fingerprint: Optional[Callable[[T], int]] = None,
+    target: Optional[int] = None,
+) -> Cycle[T]:
+    """
+    Brent's cycle detection algorithm, which only keeps two states in memory
+    (plus the state at the target index, if any, so that it can be read
+    without replaying). The price for O(1) memory is extra steps: finding the
+    period may take up to about 2 * max(start, period) steps, then finding the
+    start takes start + period more.
+
+    If a fingerprint function is given, all states are kept instead, indexed
+    by their (cheaper) fingerprints: this takes exactly start + period steps
+    and the cycle never needs to replay any state, for O(start + period)
+    memory.
+
+    States are compared on their key (only when fingerprints collide, if
+    there are fingerprints).
+
+    https://en.wikipedia.org/wiki/Cycle_detection#Brent's_algorithm
+    """
+    if fingerprint is not None:
+        return find_cycle_keeping_states(initial, step, key, fingerprint)
+
+    # Find the period by letting the hare run ahead of the tortoise, moving the
+    # tortoise to the hare's position every power of two
+    power = period = 1
+    tortoise = initial
+    hare = step(tortoise)
+    while key(tortoise) != key(hare):
+        if power == period:
+            tortoise = hare
+            power *= 2
+            period = 0
+        hare = step(hare)
+        period += 1
+
+    # Find the start of the cycle with the hare one period ahead. The hare goes
+    # through all indices up to start + period, so it also passes the target
+    # index or, if the target is further, an index in the cycle with the same
+    # state (the last one before the target with the same remainder).
+    landmark: Optional[tuple[int, T]] = None
+
+    def visit(index: int, state: T) -> None:
+        nonlocal landmark
+        if target is not None and index <= target and (target - index) % period == 0:
+            landmark = index, state
+
+    tortoise = hare = initial
+    visit(0, hare)
+    for index in range(1, period + 1):
+        hare = step(hare)
+        visit(index, hare)
+    start = 0
+    while key(tortoise) != key(hare):
+        tortoise = step(tortoise)
+        hare = step(hare)
+        start += 1
+        visit(start + period, hare)
+
+    known = {}
+    if landmark is not None:
+        index, state = landmark
+        if index >= start:
+            index = start + (index - start) % period
+        known[index] = state
+    return Cycle(
+        start=start,
+        period=period,
+        initial=initial,
+        first=tortoise,
+        step=step,
+        known=known,
+    )
+
+
+def find_cycle_keeping_states(
+    initial: T,
+    step: Callable[[T], T],
+    key: Callable[[T], Hashable],
+    fingerprint: Callable[[T], int],
+) -> Cycle[T]:
+    states: List[T] = []
+    indices: Dict[int, List[int]] = {}  # indices of the states by fingerprint
+    state = initial
+    while True:
+        state_fingerprint = fingerprint(state)
+        for index in indices.get(state_fingerprint, []):
+            if key(states[index]) == key(state):
+                return Cycle(
+                    start=index,
+                    period=len(states) - index,
+                    initial=initial,
+                    first=states[index],
+                    step=step,
+                    known=dict(enumerate(states)),
+                )
+        indices.setdefault(state_fingerprint, []).append(len(states))
+        states.append(state)
+        state = step(state)
+
+
+def test_fingerprint64():
+    assert fingerprint64(b"abc") == fingerprint64(b"abc")
+    assert fingerprint64(b"abc") != fingerprint64(b"abd")
+    assert 0 <= fingerprint64(b"abc") < 2**64
+
+
+def fingerprint64(data: bytes) -> int:
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "little")
@@ -1,7 +1,9 @@
 # https://adventofcode.com/2023/day/1
 
+from io import StringIO
 from pathlib import Path
 from textwrap import dedent
+from typing import Iterable, Optional
 import re
 
 import pytest
@@ -25,6 +27,7 @@ import pytest
 )
 def test_calibration_value(line, value, with_letters):
     assert calibration_value(line, with_letters) == value
+    assert calibration_value_with_regex(line, with_letters) == value
 
 
 DIGITS = [
@@ -41,7 +44,90 @@ DIGITS = [
 ]
 
 
-def calibration_value(line, with_letters=False):
+def test_scanner():
+    scanner = Scanner({"he": 1, "she": 2, "his": 3, "hers": 4})
+    assert scanner.first_match("ushers") == 2
+    assert scanner.first_match("ahishers") == 3
+    assert scanner.first_match("xyz") is None
+
+
+class Scanner:
+    """
+    Aho-Corasick automaton: finds the first occurrence of any of the words
+    in a single pass over the text.
+
+    https://en.wikipedia.org/wiki/Aho%E2%80%93Corasick_algorithm
+    """
+
+    def __init__(self, words: dict[str, int]) -> None:
+        # Build the trie
+        self.goto: list[dict[str, int]] = [{}]
+        self.output: list[Optional[int]] = [None]
+        for word, value in words.items():
+            state = 0
+            for char in word:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.output.append(None)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] = value
+
+        # Add failure links, breadth first
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                if self.output[next_state] is None:
+                    self.output[next_state] = self.output[self.fail[next_state]]
+                queue.append(next_state)
+
+    def first_match(self, text: Iterable[str]) -> Optional[int]:
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state] is not None:
+                return self.output[state]
+        return None
+
+
+def scanners(with_letters: bool) -> tuple[Scanner, Scanner]:
+    """
+    Scanners for the first digit, and for the last digit (on reversed lines)
+    """
+    words = {str(value): value for value in range(10)}
+    if with_letters:
+        words.update({word: value for value, word in enumerate(DIGITS)})
+    return (
+        Scanner(words),
+        Scanner({word[::-1]: value for word, value in words.items()}),
+    )
+
+
+# No word contains another one, so the first match to end is also the first
+# one to start
+SCANNERS = {with_letters: scanners(with_letters) for with_letters in (False, True)}
+
+
+def calibration_value(line: str, with_letters: bool = False) -> int:
+    forward, backward = SCANNERS[with_letters]
+    first = forward.first_match(line)
+    last = backward.first_match(reversed(line))
+    assert first is not None and last is not None
+    return (first * 10) + last
+
+
+def sum_of_calibration_values(lines: Iterable[str], with_letters: bool = False) -> int:
+    return sum(calibration_value(line, with_letters) for line in lines if line.strip())
+
+
+def calibration_value_with_regex(line, with_letters=False):
     patterns = [r"\d"]
     if with_letters:
         patterns.extend(DIGITS)
@@ -82,7 +168,7 @@ def test_part1():
 
 
 def part1(text):
-    return sum(calibration_value(line) for line in text.splitlines() if line)
+    return sum_of_calibration_values(StringIO(text))
 
 
 def test_part2():
@@ -105,11 +191,11 @@ def test_part2():
 
 
 def part2(text):
-    return sum(
-        calibration_value(line, with_letters=True) for line in text.splitlines() if line
-    )
+    return sum_of_calibration_values(StringIO(text), with_letters=True)
 
 
 if __name__ == "__main__":
-    print("Part 1", part1(Path("day01.txt").read_text()))
-    print("Part 2", part2(Path("day01.txt").read_text()))
+    with Path("day01.txt").open() as f:
+        print("Part 1", sum_of_calibration_values(f))
+    with Path("day01.txt").open() as f:
+        print("Part 2", sum_of_calibration_values(f, with_letters=True))
@@ -1,11 +1,13 @@
 # https://adventofcode.com/2023/day/2
 from __future__ import annotations
 
+from io import StringIO
 from pathlib import Path
 from textwrap import dedent
-from typing import Any, NamedTuple, Set
+from typing import Any, Iterable, List, NamedTuple, Set, Tuple
 import re
 
+import numpy as np
 import pytest
 
 
@@ -96,9 +98,15 @@ class Game(NamedTuple):
         )
 
 
+BAG = CubeSet(red=12, green=13, blue=14)
+
+
 def part1(text: str) -> int:
-    games = [Game.from_string(line) for line in text.splitlines() if line]
-    return sum(game.id for game in games if game <= CubeSet(red=12, green=13, blue=14))
+    return sum_of_possible_game_ids(StringIO(text))
+
+
+def sum_of_possible_game_ids(lines: Iterable[str]) -> int:
+    return GameTable.from_lines(lines).possible_ids_total(BAG)
 
 
 def test_part2():
@@ -106,11 +114,78 @@ def test_part2():
 
 
 def part2(text: str) -> int:
-    games = [Game.from_string(line) for line in text.splitlines() if line]
-    return sum(game.minimum().power() for game in games)
+    return sum_of_minimum_powers(StringIO(text))
+
+
+def sum_of_minimum_powers(lines: Iterable[str]) -> int:
+    return GameTable.from_lines(lines).total_power()
+
+
+def test_game_table():
+    table = GameTable.from_lines(EXAMPLE_GAMES.splitlines())
+    assert table.ids.tolist() == [1, 2, 3, 4, 5]
+    assert table.reveals.shape == (5, 3, 3)
+    assert table.reveals[4].tolist() == [[6, 3, 1], [1, 2, 2], [0, 0, 0]]
+    assert table.possible_ids_total(BAG) == 8
+    assert table.total_power() == 2286
+    games = [Game.from_string(line) for line in EXAMPLE_GAMES.splitlines() if line]
+    assert table.possible_ids_total(BAG) == sum(g.id for g in games if g <= BAG)
+    assert table.total_power() == sum(game.minimum().power() for game in games)
+
+
+COLORS = CubeSet._fields
+
+
+@pytest.mark.parametrize("text", ["", "Game 1: \nGame 2: "])
+def test_game_table_without_cubes(text):
+    table = GameTable.from_lines(text.splitlines())
+    assert table.reveals.size == 0
+    assert table.possible_ids_total(BAG) == sum(table.ids.tolist())
+    assert table.total_power() == 0
+
+
+class GameTable(NamedTuple):
+    """
+    Games in columnar form: game IDs, and reveals as red/green/blue counts,
+    padded with empty reveals to the same number per game.
+    """
+
+    ids: np.ndarray  # (games,)
+    reveals: np.ndarray  # (games, reveals, 3)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> GameTable:
+        ids: List[int] = []
+        # (game index, reveal index, color index, count) for each cube count
+        cubes: List[Tuple[int, int, int, int]] = []
+        for line in lines:
+            if not line.strip():
+                continue
+            game, reveals = line.split(": ")
+            for reveal_index, reveal in enumerate(reveals.split("; ")):
+                for count, color in re.findall(r"(\d+) (red|green|blue)", reveal):
+                    cubes.append(
+                        (len(ids), reveal_index, COLORS.index(color), int(count))
+                    )
+            ids.append(int(game.removeprefix("Game ")))
+        games, reveal_indices, colors, counts = (
+            np.array(cubes, dtype=np.int64).reshape(-1, 4).T
+        )
+        nb_reveals = reveal_indices.max(initial=-1) + 1
+        table = np.zeros((len(ids), nb_reveals, 3), dtype=np.int64)
+        table[games, reveal_indices, colors] = counts
+        return cls(ids=np.array(ids, dtype=np.int64), reveals=table)
+
+    def possible_ids_total(self, bag: CubeSet) -> int:
+        possible = (self.reveals <= np.array(bag)).all(axis=(1, 2))
+        return int(self.ids[possible].sum())
+
+    def total_power(self) -> int:
+        return int(self.reveals.max(axis=1, initial=0).prod(axis=1).sum())
 
 
 if __name__ == "__main__":
-    puzzle_input = Path("day02.txt").read_text()
-    print("Part 1", part1(puzzle_input))
-    print("Part 2", part2(puzzle_input))
+    with Path("day02.txt").open() as f:
+        print("Part 1", sum_of_possible_game_ids(f))
+    with Path("day02.txt").open() as f:
+        print("Part 2", sum_of_minimum_powers(f))
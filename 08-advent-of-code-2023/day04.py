@@ -3,10 +3,12 @@ from __future__ import annotations
 
 from collections import Counter
 from dataclasses import dataclass
+from io import StringIO
 from pathlib import Path
-from typing import Set
+from typing import Iterable, List, NamedTuple, Set
 import re
 
+import numpy as np
 import pytest
 
 
@@ -25,8 +27,11 @@ def test_part1():
 
 
 def part1(text: str) -> int:
-    cards = [Card.from_string(line) for line in text.splitlines() if line]
-    return sum(card.points() for card in cards)
+    return total_points(StringIO(text))
+
+
+def total_points(lines: Iterable[str]) -> int:
+    return CardTable.from_lines(lines).total_points()
 
 
 def test_parse_card():
@@ -47,6 +52,14 @@ def test_part2():
 
 
 def part2(text: str) -> int:
+    return total_cards(StringIO(text))
+
+
+def total_cards(lines: Iterable[str]) -> int:
+    return CardTable.from_lines(lines).total_cards()
+
+
+def total_cards_with_counter(text: str) -> int:
     cards = {
         card.number: card
         for card in (Card.from_string(line) for line in text.splitlines() if line)
@@ -87,7 +100,85 @@ class Card:
         return len(self.numbers_you_have.intersection(self.winning_numbers))
 
 
+def test_card_table():
+    table = CardTable.from_lines(EXAMPLE_CARDS.splitlines())
+    assert table.winning_numbers.shape == (6, 5)
+    assert table.numbers_you_have.shape == (6, 8)
+    assert table.number_of_matching_numbers().tolist() == [4, 2, 2, 1, 0, 0]
+    assert table.total_points() == 13
+    assert table.total_cards() == 30
+    assert table.total_cards() == total_cards_with_counter(EXAMPLE_CARDS)
+
+
+def test_empty_card_table():
+    table = CardTable.from_lines([])
+    assert table.winning_numbers.shape == (0, 0)
+    assert table.total_points() == 0
+    assert table.total_cards() == 0
+
+
+class CardTable(NamedTuple):
+    """
+    Cards in columnar form, as fixed-width arrays of numbers (padded with -1)
+    """
+
+    numbers: np.ndarray  # (cards,)
+    winning_numbers: np.ndarray  # (cards, winning numbers)
+    numbers_you_have: np.ndarray  # (cards, numbers you have)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> CardTable:
+        numbers: List[int] = []
+        winning_numbers: List[List[int]] = []
+        numbers_you_have: List[List[int]] = []
+        for line in lines:
+            if not line.strip():
+                continue
+            identification, winning, have = re.split(r"[:|]", line)
+            numbers.append(int(identification.split()[1]))
+            winning_numbers.append([int(n) for n in winning.split()])
+            numbers_you_have.append([int(n) for n in have.split()])
+        return cls(
+            numbers=np.array(numbers, dtype=np.int64),
+            winning_numbers=padded(winning_numbers),
+            numbers_you_have=padded(numbers_you_have),
+        )
+
+    def number_of_matching_numbers(self) -> np.ndarray:
+        # One row per card, with a column for each possible number (plus one
+        # for padding, which never counts as winning)
+        highest = max(
+            self.winning_numbers.max(initial=-1), self.numbers_you_have.max(initial=-1)
+        )
+        size = highest + 2
+        rows = np.arange(len(self.numbers))[:, np.newaxis]
+        is_winning = np.zeros((len(self.numbers), size), dtype=bool)
+        is_winning[rows, self.winning_numbers] = True
+        is_winning[:, -1] = False
+        return is_winning[rows, self.numbers_you_have].sum(axis=1)
+
+    def total_points(self) -> int:
+        matching = self.number_of_matching_numbers()
+        return int(((1 << matching) >> 1).sum())  # 0 or 2 ** (matching - 1)
+
+    def total_cards(self) -> int:
+        matching = self.number_of_matching_numbers()
+        counts = np.ones(len(matching), dtype=np.int64)
+        for i, nb_matching in enumerate(matching):
+            counts[i + 1 : i + 1 + nb_matching] += counts[i]
+        return int(counts.sum())
+
+
+def padded(rows: List[List[int]], fill: int = -1) -> np.ndarray:
+    width = max((len(row) for row in rows), default=0)
+    res = np.full((len(rows), width), fill, dtype=np.int64)
+    for i, row in enumerate(rows):
+        res[i, : len(row)] = row
+    return res
+
+
 if __name__ == "__main__":
-    puzzle_input = Path("day04.txt").read_text()
-    print("Part 1", part1(puzzle_input))
-    print("Part 2", part2(puzzle_input))
+    with Path("day04.txt").open() as f:
+        print("Part 1", total_points(f))
+    with Path("day04.txt").open() as f:
+        print("Part 2", total_cards(f))
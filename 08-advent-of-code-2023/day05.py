@@ -1,12 +1,18 @@
 # https://adventofcode.com/2023/day/5
 from __future__ import annotations
 
+from bisect import bisect_right
 from dataclasses import dataclass
+from functools import cached_property
+from io import StringIO
 from pathlib import Path
 from textwrap import dedent
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 import re
 
+import numpy as np
+
+from inputs import read_paragraphs
 
 
 EXAMPLE_ALMANAC = """\
@@ -60,18 +66,102 @@ def test_range():
     assert r.map(98) is None
 
 
+def test_interval_set():
+    intervals = IntervalSet.from_intervals(
+        [Interval(10, 20), Interval(0, 5), Interval(15, 25), Interval(5, 7)]
+    )
+    assert intervals.intervals == [Interval(0, 7), Interval(10, 25)]
+    assert intervals.length == 22
+    assert intervals.min() == 0
+
+
+class Interval(NamedTuple):
+    start: int
+    end: int  # exclusive
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+
+@dataclass(frozen=True)
+class IntervalSet:
+    intervals: List[Interval]  # sorted, disjoint and non-adjacent
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Interval]) -> IntervalSet:
+        merged: List[Interval] = []
+        for interval in sorted(i for i in intervals if i.start < i.end):
+            if merged and interval.start <= merged[-1].end:
+                last = merged.pop()
+                interval = Interval(last.start, max(last.end, interval.end))
+            merged.append(interval)
+        return cls(intervals=merged)
+
+    def __iter__(self) -> Iterator[Interval]:
+        return iter(self.intervals)
+
+    @property
+    def length(self) -> int:
+        return sum(interval.length for interval in self.intervals)
+
+    def min(self) -> int:
+        return self.intervals[0].start
+
+
+def test_range_map_interval():
+    r = Range(destination=52, source=50, length=48)
+    assert r.map_interval(Interval(40, 45)) == (None, [Interval(40, 45)])
+    assert r.map_interval(Interval(40, 60)) == (Interval(52, 62), [Interval(40, 50)])
+    assert r.map_interval(Interval(60, 70)) == (Interval(62, 72), [])
+    assert r.map_interval(Interval(90, 110)) == (
+        Interval(92, 100),
+        [Interval(98, 110)],
+    )
+    assert r.map_interval(Interval(0, 200)) == (
+        Interval(52, 100),
+        [Interval(0, 50), Interval(98, 200)],
+    )
+
+
 @dataclass(frozen=True)
 class Range:
     destination: int
     source: int
     length: int
 
+    @property
+    def source_end(self) -> int:
+        return self.source + self.length
+
+    @property
+    def offset(self) -> int:
+        return self.destination - self.source
+
     def map(self, value: int) -> Optional[int]:
         d = value - self.source
         if 0 <= d < self.length:
             return self.destination + d
         return None
 
+    def map_interval(
+        self, interval: Interval
+    ) -> Tuple[Optional[Interval], List[Interval]]:
+        """
+        Split the interval into the part covered by this range (mapped to the
+        destination) and the parts left untouched on either side.
+        """
+        start = max(interval.start, self.source)
+        end = min(interval.end, self.source_end)
+        if start >= end:
+            return None, [interval]
+        left = Interval(interval.start, start)
+        right = Interval(end, interval.end)
+        return (
+            Interval(start + self.offset, end + self.offset),
+            [i for i in (left, right) if i.start < i.end],
+        )
+
 
 def test_map():
     m = Map(
@@ -88,6 +178,19 @@ def test_map():
     assert m[13] == 13
 
 
+def test_map_many():
+    m = Map(
+        source="seed",
+        destination="soil",
+        ranges=[
+            Range(destination=50, source=98, length=2),
+            Range(destination=52, source=50, length=48),
+        ],
+    )
+    values = np.arange(120, dtype=np.int64)
+    assert m.map_many(values).tolist() == [m[value] for value in range(120)]
+
+
 def test_parse_map():
     m = Map.from_string(
         dedent(
@@ -106,6 +209,20 @@ def test_parse_map():
     ]
 
 
+class MapIndex(NamedTuple):
+    # Parallel sequences, sorted by source start
+    starts: Sequence[int]
+    lengths: Sequence[int]
+    offsets: Sequence[int]
+
+
+class ArrayMapIndex(NamedTuple):
+    # Same as MapIndex, as NumPy arrays
+    starts: np.ndarray
+    lengths: np.ndarray
+    offsets: np.ndarray
+
+
 @dataclass(frozen=True)
 class Map:
     source: str
@@ -123,13 +240,157 @@ class Map:
             ranges=[Range(*(int(s) for s in line.split(" "))) for line in lines[1:]],
         )
 
+    @cached_property
+    def index(self) -> MapIndex:
+        ranges = sorted(self.ranges, key=lambda r: r.source)
+        return MapIndex(
+            starts=[r.source for r in ranges],
+            lengths=[r.length for r in ranges],
+            offsets=[r.offset for r in ranges],
+        )
+
+    @cached_property
+    def array_index(self) -> ArrayMapIndex:
+        return ArrayMapIndex(*(np.array(a, dtype=np.int64) for a in self.index))
+
     def __getitem__(self, value: int) -> int:
-        for range_ in self.ranges:
-            res = range_.map(value)
-            if res is not None:
-                return res
+        starts, lengths, offsets = self.index
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value - starts[i] < lengths[i]:
+            return value + offsets[i]
         return value
 
+    def map_many(self, values: np.ndarray) -> np.ndarray:
+        if not self.ranges:
+            return values.copy()
+        starts, lengths, offsets = self.array_index
+        i = np.searchsorted(starts, values, side="right") - 1
+        j = np.maximum(i, 0)
+        inside = (i >= 0) & (values - starts[j] < lengths[j])
+        return np.where(inside, values + offsets[j], values)
+
+    def map_intervals(self, intervals: IntervalSet) -> IntervalSet:
+        mapped: List[Interval] = []
+        unmapped = list(intervals)
+        for range_ in self.ranges:
+            remaining = []
+            for interval in unmapped:
+                res, rest = range_.map_interval(interval)
+                if res is not None:
+                    mapped.append(res)
+                remaining.extend(rest)
+            unmapped = remaining
+        return IntervalSet.from_intervals(mapped + unmapped)
+
+
+def test_piecewise_linear_from_map():
+    m = Map.from_string(
+        dedent(
+            """
+            seed-to-soil map:
+            50 98 2
+            52 50 48
+            """
+        )
+    )
+    f = PiecewiseLinear.from_map(m)
+    assert f.starts == [0, 50, 98, 100]
+    assert f.offsets == [0, 2, -48, 0]
+    assert all(f(value) == m[value] for value in range(120))
+
+
+def test_piecewise_linear_then():
+    almanac = Almanac.from_string(EXAMPLE_ALMANAC)
+    soil = PiecewiseLinear.from_map(almanac.maps["seed"])
+    fertilizer = PiecewiseLinear.from_map(almanac.maps["soil"])
+    composed = soil.then(fertilizer)
+    for seed in range(120):
+        assert composed(seed) == almanac.maps["soil"][almanac.maps["seed"][seed]]
+
+
+def test_piecewise_linear_min_over():
+    f = PiecewiseLinear(starts=[0, 50, 98, 100], offsets=[0, 2, -48, 0])
+    assert f.min_over(Interval(10, 20)) == 10
+    assert f.min_over(Interval(60, 99)) == 50
+    assert f.min_over(Interval(99, 200)) == 51
+
+
+@dataclass(frozen=True)
+class PiecewiseLinear:
+    """
+    A function over non-negative integers made of pieces of the form
+    x -> x + offset. Piece i covers [starts[i], starts[i + 1]), and the last
+    piece extends to infinity.
+    """
+
+    starts: List[int]
+    offsets: List[int]
+
+    @classmethod
+    def from_map(cls, map_: Map) -> PiecewiseLinear:
+        starts = [0]
+        offsets = [0]
+        for range_ in sorted(map_.ranges, key=lambda r: r.source):
+            if range_.source == starts[-1]:
+                offsets[-1] = range_.offset
+            else:
+                starts.append(range_.source)
+                offsets.append(range_.offset)
+            starts.append(range_.source_end)
+            offsets.append(0)
+        return cls._merged(starts, offsets)
+
+    @classmethod
+    def _merged(cls, starts: List[int], offsets: List[int]) -> PiecewiseLinear:
+        merged_starts: List[int] = []
+        merged_offsets: List[int] = []
+        for start, offset in zip(starts, offsets):
+            if merged_starts and merged_starts[-1] == start:
+                merged_offsets[-1] = offset
+            elif not merged_offsets or merged_offsets[-1] != offset:
+                merged_starts.append(start)
+                merged_offsets.append(offset)
+        return cls(starts=merged_starts, offsets=merged_offsets)
+
+    def __call__(self, value: int) -> int:
+        return value + self.offsets[bisect_right(self.starts, value) - 1]
+
+    def pieces(self) -> Iterator[Tuple[int, Optional[int], int]]:
+        """
+        (start, end, offset) of each piece, where end is None for the last one
+        """
+        ends: List[Optional[int]] = [*self.starts[1:], None]
+        return zip(self.starts, ends, self.offsets)
+
+    def then(self, other: PiecewiseLinear) -> PiecewiseLinear:
+        """
+        Compose two functions: the result maps x to other(self(x)).
+        """
+        starts = []
+        offsets = []
+        for start, end, offset in self.pieces():
+            # Split the image of this piece on the breakpoints of the other function
+            i = bisect_right(other.starts, start + offset) - 1
+            while True:
+                starts.append(max(start, other.starts[i] - offset))
+                offsets.append(offset + other.offsets[i])
+                i += 1
+                if i == len(other.starts) or (
+                    end is not None and other.starts[i] - offset >= end
+                ):
+                    break
+        return self._merged(starts, offsets)
+
+    def min_over(self, interval: Interval) -> int:
+        # Each piece is increasing, so its minimum is at its leftmost point
+        i = bisect_right(self.starts, interval.start) - 1
+        res = interval.start + self.offsets[i]
+        for i in range(i + 1, len(self.starts)):
+            if self.starts[i] >= interval.end:
+                break
+            res = min(res, self.starts[i] + self.offsets[i])
+        return res
+
 
 def test_almanac():
     almanac = Almanac.from_string(EXAMPLE_ALMANAC)
@@ -160,9 +421,13 @@ class Almanac:
 
     @classmethod
     def from_string(cls, text: str) -> Almanac:
-        paragraphs = [p for p in text.split("\n\n") if p]
-        seeds = [int(s) for s in paragraphs[0].split(": ")[1].split(" ")]
-        maps = [Map.from_string(paragraph) for paragraph in paragraphs[1:]]
+        return cls.from_paragraphs(read_paragraphs(StringIO(text)))
+
+    @classmethod
+    def from_paragraphs(cls, paragraphs: Iterable[str]) -> Almanac:
+        paragraphs = iter(paragraphs)
+        seeds = [int(s) for s in next(paragraphs).split(": ")[1].split()]
+        maps = (Map.from_string(paragraph) for paragraph in paragraphs)
         return cls(
             seeds=seeds,
             maps={m.source: m for m in maps},
@@ -179,16 +444,103 @@ class Almanac:
             value, kind = self.map(value, kind)
         return value
 
+    def map_many(self, seeds: np.ndarray) -> np.ndarray:
+        values = np.asarray(seeds, dtype=np.int64)
+        kind = "seed"
+        while kind != "location":
+            map_ = self.maps[kind]
+            values, kind = map_.map_many(values), map_.destination
+        return values
+
+    def seed_ranges(self) -> IntervalSet:
+        return IntervalSet.from_intervals(
+            Interval(start, start + length)
+            for start, length in zip(self.seeds[::2], self.seeds[1::2])
+        )
+
+    def find_locations(self, seeds: IntervalSet) -> IntervalSet:
+        kind = "seed"
+        while kind != "location":
+            map_ = self.maps[kind]
+            seeds, kind = map_.map_intervals(seeds), map_.destination
+        return seeds
+
+    @cached_property
+    def location_function(self) -> PiecewiseLinear:
+        kind = "seed"
+        res = PiecewiseLinear(starts=[0], offsets=[0])
+        while kind != "location":
+            map_ = self.maps[kind]
+            res, kind = res.then(PiecewiseLinear.from_map(map_)), map_.destination
+        return res
+
+    def lowest_location(self, seeds: IntervalSet) -> int:
+        return min(self.location_function.min_over(interval) for interval in seeds)
+
+
+def test_almanac_map_many():
+    almanac = Almanac.from_string(EXAMPLE_ALMANAC)
+    assert almanac.map_many(np.array([79, 14, 55, 13])).tolist() == [82, 43, 86, 35]
+
+
+def test_seed_ranges():
+    almanac = Almanac.from_string(EXAMPLE_ALMANAC)
+    assert almanac.seed_ranges().intervals == [Interval(55, 68), Interval(79, 93)]
+
+
+def test_find_locations():
+    almanac = Almanac.from_string(EXAMPLE_ALMANAC)
+    seeds = almanac.seed_ranges()
+    locations = almanac.find_locations(seeds)
+    assert locations.length == seeds.length
+    assert locations.min() == 46
+    assert set(value for interval in locations for value in range(*interval)) == set(
+        almanac.find_location(seed) for interval in seeds for seed in range(*interval)
+    )
+
+
+def test_location_function():
+    almanac = Almanac.from_string(EXAMPLE_ALMANAC)
+    for seed in range(120):
+        assert almanac.location_function(seed) == almanac.find_location(seed)
+
 
 def test_part1():
     assert part1(EXAMPLE_ALMANAC) == 35
 
 
 def part1(text: str) -> int:
-    almanac = Almanac.from_string(text)
+    return lowest_seed_location(read_paragraphs(StringIO(text)))
+
+
+def lowest_seed_location(paragraphs: Iterable[str]) -> int:
+    almanac = Almanac.from_paragraphs(paragraphs)
     return min(almanac.find_location(seed) for seed in almanac.seeds)
 
 
+def test_part2():
+    assert part2(EXAMPLE_ALMANAC) == 46
+
+
+def part2(text: str) -> int:
+    return lowest_seed_range_location(read_paragraphs(StringIO(text)))
+
+
+def lowest_seed_range_location(paragraphs: Iterable[str]) -> int:
+    almanac = Almanac.from_paragraphs(paragraphs)
+    return almanac.lowest_location(almanac.seed_ranges())
+
+
+def test_almanac_from_file(tmp_path):
+    path = tmp_path / "almanac.txt"
+    path.write_text(EXAMPLE_ALMANAC)
+    with path.open() as f:
+        almanac = Almanac.from_paragraphs(read_paragraphs(f))
+    assert almanac == Almanac.from_string(EXAMPLE_ALMANAC)
+
+
 if __name__ == "__main__":
-    puzzle_input = Path("day05.txt").read_text()
-    print("Part 1", part1(puzzle_input))
+    with Path("day05.txt").open() as f:
+        print("Part 1", lowest_seed_location(read_paragraphs(f)))
+    with Path("day05.txt").open() as f:
+        print("Part 2", lowest_seed_range_location(read_paragraphs(f)))
@@ -4,8 +4,10 @@ from __future__ import annotations
 from collections import Counter
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import List
+from functools import cached_property
+from typing import ClassVar, List, Optional, Sequence
 
+import numpy as np
 import pytest
 
 
@@ -72,7 +74,8 @@ class Hand:
     cards: str
     bid: int
 
-    CARDS = "23456789TJQKA"  # by order of strength
+    CARDS: ClassVar[str] = "23456789TJQKA"  # by order of strength
+    JOKER: ClassVar[Optional[str]] = None
 
     @classmethod
     def parse(cls, text: str) -> Hand:
@@ -101,16 +104,66 @@ class Hand:
         else:
             return HandType.HIGH_CARD
 
+    @cached_property
+    def rank_key(self) -> int:
+        """
+        The hand type in the high bits, then the strength of each card as a
+        base-13 number, so that hands are ordered like their keys
+        """
+        strengths = 0
+        for card in self.cards:
+            strengths = strengths * 13 + self.CARDS.index(card)
+        return (self.hand_type << 20) + strengths
+
     def __lt__(self, other) -> bool:
-        if self.hand_type == other.hand_type:
-            for card, other_card in zip(self.cards, other.cards):
-                if card != other_card:
-                    return self.CARDS.index(card) < self.CARDS.index(other_card)
-        return self.hand_type < other.hand_type
+        return self.rank_key < other.rank_key
+
+    @classmethod
+    def rank_keys(cls, cards: Sequence[str]) -> np.ndarray:
+        """
+        Compute the rank keys of many hands at once
+        """
+        strength_of = np.zeros(256, dtype=np.int64)
+        for strength, card in enumerate(cls.CARDS):
+            strength_of[ord(card)] = strength
+        chars = np.frombuffer("".join(cards).encode(), dtype=np.uint8)
+        strengths = strength_of[chars].reshape(len(cards), 5)
+
+        counts = (strengths[:, :, np.newaxis] == np.arange(13)).sum(axis=1)
+        nb_jokers = np.zeros(len(cards), dtype=np.int64)
+        if cls.JOKER is not None:
+            joker = cls.CARDS.index(cls.JOKER)
+            nb_jokers = counts[:, joker].copy()
+            counts[:, joker] = 0
+        counts.sort(axis=1)
+        # Jokers join the largest group
+        hand_types = HAND_TYPES[counts[:, -1] + nb_jokers, counts[:, -2]]
+
+        weights = 13 ** np.arange(4, -1, -1)
+        return (hand_types << 20) + strengths @ weights
+
+    @classmethod
+    def total_winnings(cls, text: str) -> int:
+        cards, bids = zip(*(line.split(" ") for line in text.splitlines() if line))
+        order = np.argsort(cls.rank_keys(cards), kind="stable")
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(1, len(order) + 1)
+        return int(ranks @ np.array(bids, dtype=np.int64))
+
+
+# Hand type by size of the largest and second largest group of cards
+HAND_TYPES = np.full((6, 6), HandType.HIGH_CARD, dtype=np.int64)
+HAND_TYPES[5, 0] = HandType.FIVE_OF_A_KIND
+HAND_TYPES[4, 1] = HandType.FOUR_OF_A_KIND
+HAND_TYPES[3, 2] = HandType.FULL_HOUSE
+HAND_TYPES[3, 1] = HandType.THREE_OF_A_KIND
+HAND_TYPES[2, 2] = HandType.TWO_PAIR
+HAND_TYPES[2, 1] = HandType.ONE_PAIR
 
 
 def test_part1():
     assert part1(EXAMPLE_HANDS) == 6440
+    assert Hand.total_winnings(EXAMPLE_HANDS) == 6440
 
 
 def part1(text: str) -> int:
@@ -161,6 +214,7 @@ def test_ranks_with_jokers():
 
 class HandWithJoker(Hand):
     CARDS = "J23456789TQKA"  # by order of strength
+    JOKER = "J"
 
     @property
     def hand_type(self) -> HandType:
@@ -183,8 +237,17 @@ class HandWithJoker(Hand):
             return HandType.HIGH_CARD
 
 
+@pytest.mark.parametrize("hand_class", [Hand, HandWithJoker])
+def test_rank_keys(hand_class):
+    cards = ["32T3K", "T55J5", "KK677", "KTJJT", "QQQJA", "JJJJJ", "AAAAJ", "23456"]
+    hands = [hand_class(c, 1) for c in cards]
+    assert hand_class.rank_keys(cards).tolist() == [hand.rank_key for hand in hands]
+    assert [hand.rank_key >> 20 for hand in hands] == [hand.hand_type for hand in hands]
+
+
 def test_part2():
     assert part2(EXAMPLE_HANDS) == 5905
+    assert HandWithJoker.total_winnings(EXAMPLE_HANDS) == 5905
 
 
 def part2(text: str) -> int:
@@ -200,5 +263,5 @@ def read_puzzle_input():
 
 if __name__ == "__main__":
     puzzle_input = read_puzzle_input()
-    print("Part 1", part1(puzzle_input))
-    print("Part 2", part2(puzzle_input))
+    print("Part 1", Hand.total_winnings(puzzle_input))
+    print("Part 2", HandWithJoker.total_winnings(puzzle_input))
@@ -3,11 +3,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from enum import IntEnum
+from functools import cached_property
 from itertools import cycle
-from math import lcm
-from typing import Dict, List, Tuple
+from math import gcd
+from typing import Dict, Iterable, List, Optional, Tuple
 import re
 
+import numpy as np
 import pytest
 
 
@@ -90,13 +92,216 @@ class Map:
         return result
 
 
+def test_ghost_cycle():
+    compiled = CompiledMap(Map.from_string(EXAMPLE_MAP))
+    ghost = compiled.ghost_cycle("AAA")
+    assert ghost.tail == [2]
+    assert (ghost.start, ghost.period, ghost.residues) == (2, 2, [0, 1])
+    assert [step for step in range(1, 8) if ghost.is_at_end(step)] == [2, 3, 4, 5, 6, 7]
+
+
+@dataclass(frozen=True)
+class GhostCycle:
+    """
+    The steps at which a ghost is on an end node: some isolated steps before
+    the loop, then every step congruent to one of the residues modulo the
+    period, after the start of the loop.
+    """
+
+    tail: List[int]
+    start: int  # the loop covers all steps strictly after this one
+    period: int
+    residues: List[int]
+
+    def is_at_end(self, step: int) -> bool:
+        if step <= self.start:
+            return step in self.tail
+        return step % self.period in self.residues
+
+
+class CompiledMap:
+    """
+    The network with nodes compiled to integer IDs, and a transition table
+    from each node to the node reached after a whole block of instructions.
+    """
+
+    def __init__(self, m: Map) -> None:
+        self.names = list(m.network)
+        ids = {name: i for i, name in enumerate(self.names)}
+        self.ids = ids
+        self.moves = [
+            [ids[m.network[name][direction]] for name in self.names]
+            for direction in Direction
+        ]
+        self.is_end = [name.endswith("Z") for name in self.names]
+        self.instructions = m.instructions
+
+        # Where each node leads after a whole block of instructions, and the
+        # steps (from 1 to the block length) that land on an end node
+        self.block: List[int] = []
+        self.block_ends: List[List[int]] = []
+        for start in range(len(self.names)):
+            node = start
+            ends = []
+            for step, direction in enumerate(self.instructions, start=1):
+                node = self.moves[direction][node]
+                if self.is_end[node]:
+                    ends.append(step)
+            self.block.append(node)
+            self.block_ends.append(ends)
+
+    def ghost_cycle(self, origin: Node) -> GhostCycle:
+        length = len(self.instructions)
+        seen: Dict[int, int] = {}
+        blocks: List[int] = []
+        node = self.ids[origin]
+        while node not in seen:
+            seen[node] = len(blocks)
+            blocks.append(node)
+            node = self.block[node]
+        loop_start = seen[node]
+
+        tail = []
+        residues = set()
+        period = (len(blocks) - loop_start) * length
+        for i, node in enumerate(blocks):
+            for step in self.block_ends[node]:
+                if i < loop_start:
+                    tail.append(i * length + step)
+                else:
+                    residues.add((i * length + step) % period)
+        return GhostCycle(
+            tail=tail,
+            start=loop_start * length,
+            period=period,
+            residues=sorted(residues),
+        )
+
+    def first_common_end(self, origins: Iterable[Node]) -> int:
+        ghosts = [self.ghost_cycle(origin) for origin in origins]
+        candidates = []
+
+        # Steps before some ghost enters its loop
+        for ghost in ghosts:
+            for step in ghost.tail:
+                if all(other.is_at_end(step) for other in ghosts):
+                    candidates.append(step)
+
+        # Steps when all ghosts are in their loops
+        start = max(ghost.start for ghost in ghosts) + 1
+        congruences = [(0, 1)]
+        for ghost in ghosts:
+            congruences = [
+                solution
+                for residue, modulo in congruences
+                for other in ghost.residues
+                if (solution := crt(residue, modulo, other, ghost.period)) is not None
+            ]
+        for residue, modulo in congruences:
+            candidates.append(
+                residue + (start - residue + modulo - 1) // modulo * modulo
+            )
+
+        if not candidates:
+            raise ValueError("The ghosts are never all on end nodes at the same time")
+        return min(candidates)
+
+    @cached_property
+    def move_table(self) -> np.ndarray:
+        return np.array(self.moves, dtype=np.int32)
+
+    @cached_property
+    def jump_tables(self) -> List[np.ndarray]:
+        """
+        jump_tables[k][node] is the node reached after 2**k blocks of
+        instructions (grown on demand by jump_table)
+        """
+        return [np.array(self.block, dtype=np.int32)]
+
+    def jump_table(self, k: int) -> np.ndarray:
+        tables = self.jump_tables
+        while len(tables) <= k:
+            tables.append(tables[-1][tables[-1]])
+        return tables[k]
+
+    def position_after(self, origin: Node, steps: int) -> Node:
+        [node] = self.positions_after([origin], steps)
+        return node
+
+    def positions_after(
+        self, origins: Iterable[Node], steps: int | np.ndarray
+    ) -> List[Node]:
+        nodes = np.array([self.ids[origin] for origin in origins], dtype=np.int32)
+        steps = np.broadcast_to(np.asarray(steps, dtype=np.int64), nodes.shape)
+        blocks, remainders = np.divmod(steps, len(self.instructions))
+
+        # Whole blocks of instructions, by binary lifting
+        k = 0
+        while (blocks >> k).any():
+            bit = ((blocks >> k) & 1).astype(bool)
+            nodes = np.where(bit, self.jump_table(k)[nodes], nodes)
+            k += 1
+
+        # Then the first instructions of the last block
+        for i in range(int(remainders.max(initial=0))):
+            move = self.move_table[self.instructions[i]]
+            nodes = np.where(remainders > i, move[nodes], nodes)
+
+        return [self.names[node] for node in nodes]
+
+
+def test_position_after():
+    m = Map.from_string(NEW_EXAMPLE_MAP)
+    compiled = CompiledMap(m)
+    for origin in ["11A", "22A"]:
+        node = origin
+        instructions = cycle(m.instructions)
+        for steps in range(20):
+            assert compiled.position_after(origin, steps) == node
+            node = m.network[node][next(instructions)]
+
+
+def test_positions_after():
+    compiled = CompiledMap(Map.from_string(NEW_EXAMPLE_MAP))
+    assert compiled.positions_after(["11A", "22A"], 10**12) == ["11Z", "22B"]
+    assert compiled.positions_after(
+        ["11A", "22A"], np.array([10**12 + 1, 10**12 + 2])
+    ) == ["11B", "22Z"]
+
+
+@pytest.mark.parametrize(
+    "r1, m1, r2, m2, res",
+    [
+        (2, 3, 3, 5, (8, 15)),
+        (1, 4, 3, 6, (9, 12)),
+        (1, 4, 2, 6, None),
+        (0, 1, 5, 7, (5, 7)),
+    ],
+)
+def test_crt(r1, m1, r2, m2, res):
+    assert crt(r1, m1, r2, m2) == res
+
+
+def crt(r1: int, m1: int, r2: int, m2: int) -> Optional[Tuple[int, int]]:
+    """
+    Generalized Chinese remainder theorem (moduli need not be coprime): solve
+    x = r1 (mod m1) and x = r2 (mod m2)
+    """
+    g = gcd(m1, m2)
+    if (r2 - r1) % g:
+        return None
+    modulo = m1 // g * m2
+    k = (r2 - r1) // g * pow(m1 // g, -1, m2 // g) % (m2 // g)
+    return (r1 + m1 * k) % modulo, modulo
+
+
 def test_part1():
     assert part1(EXAMPLE_MAP) == 2
 
 
 def part1(text: str) -> int:
-    m = Map.from_string(text)
-    return len(m.path("AAA"))
+    compiled = CompiledMap(Map.from_string(text))
+    return compiled.first_common_end(["AAA"])
 
 
 NEW_EXAMPLE_MAP = """\
@@ -117,10 +322,29 @@ def test_part2():
     assert part2(NEW_EXAMPLE_MAP) == 6
 
 
+# The ghosts do not loop back to their first end node: the least common
+# multiple of the lengths of their paths (2) is not the answer
+UNALIGNED_EXAMPLE_MAP = """\
+L
+
+11A = (11Z, 11Z)
+11Z = (11B, 11B)
+11B = (11C, 11C)
+11C = (11Z, 11Z)
+22A = (22B, 22B)
+22B = (22Z, 22Z)
+22Z = (22B, 22B)
+"""
+
+
+def test_part2_unaligned():
+    assert part2(UNALIGNED_EXAMPLE_MAP) == 4
+
+
 def part2(text: str) -> int:
     m = Map.from_string(text)
     origins = [node for node in m.network if node.endswith("A")]
-    return lcm(*(len(m.path(origin)) for origin in origins))  # least common multiple
+    return CompiledMap(m).first_common_end(origins)
 
 
 def read_puzzle_input():
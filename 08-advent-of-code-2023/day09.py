@@ -1,10 +1,13 @@
 # https://adventofcode.com/2023/day/9
 from __future__ import annotations
 
+from collections import defaultdict
 from dataclasses import dataclass
+from math import comb
 from typing import List
 
 from more_itertools import pairwise
+import numpy as np
 
 import pytest
 
@@ -69,12 +72,72 @@ class Sequence:
             return self.values[0] - self.differences().predict_previous()
 
 
+def test_extrapolation_weights():
+    assert extrapolation_weights(3) == [1, -3, 3]
+    assert extrapolation_weights(3, backward=True) == [3, -3, 1]
+
+
+def extrapolation_weights(n: int, backward: bool = False) -> List[int]:
+    """
+    The n-th differences of n + 1 consecutive values are zero, so the next
+    (or previous) value is a binomial-weighted sum of the n known ones.
+    """
+    if backward:
+        return [(-1) ** i * comb(n, i + 1) for i in range(n)]
+    return [(-1) ** (n - 1 - i) * comb(n, i) for i in range(n)]
+
+
+@pytest.mark.parametrize("backward", [False, True])
+def test_extrapolate(backward):
+    sequences = Sequence.from_list(EXAMPLE_REPORT) + [
+        Sequence([1, 4, 9]),
+        Sequence([10**18, 2 * 10**18, 3 * 10**18]),
+        Sequence([]),
+    ]
+    assert extrapolate(sequences, backward=backward) == [
+        sequence.predict_previous() if backward else sequence.predict_next()
+        for sequence in sequences
+    ]
+
+
+def extrapolate(sequences: List[Sequence], backward: bool = False) -> List[int]:
+    """
+    Predict the next (or previous) value of all sequences, with one
+    matrix-vector product per sequence length.
+    """
+    res = [0] * len(sequences)
+    by_length = defaultdict(list)
+    for i, sequence in enumerate(sequences):
+        by_length[len(sequence.values)].append(i)
+
+    for length, indexes in by_length.items():
+        if length == 0:
+            continue
+        weights = extrapolation_weights(length, backward)
+        rows = [sequences[i].values for i in indexes]
+        bound = (
+            length
+            * max(abs(w) for w in weights)
+            * max(abs(v) for row in rows for v in row)
+        )
+        if bound < 2**63:
+            predictions = (
+                np.array(rows, dtype=np.int64) @ np.array(weights, dtype=np.int64)
+            ).tolist()
+        else:
+            # Could overflow 64-bit integers, use Python integers instead
+            predictions = [sum(w * v for w, v in zip(weights, row)) for row in rows]
+        for i, prediction in zip(indexes, predictions):
+            res[i] = prediction
+    return res
+
+
 def test_part1():
     assert part1(EXAMPLE_REPORT) == 114
 
 
 def part1(text: str) -> int:
-    return sum(sequence.predict_next() for sequence in Sequence.from_list(text))
+    return sum(extrapolate(Sequence.from_list(text)))
 
 
 def test_predict_previous():
@@ -86,7 +149,7 @@ def test_part2():
 
 
 def part2(text: str) -> int:
-    return sum(sequence.predict_previous() for sequence in Sequence.from_list(text))
+    return sum(extrapolate(Sequence.from_list(text), backward=True))
 
 
 def read_puzzle_input():
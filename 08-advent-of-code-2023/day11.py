@@ -3,9 +3,9 @@ from __future__ import annotations
 
 from collections import defaultdict
 from dataclasses import dataclass
-from itertools import combinations
+from itertools import accumulate, combinations
 from textwrap import dedent
-from typing import Iterator, NamedTuple, Set, Tuple
+from typing import Iterator, NamedTuple, Sequence, Set, Tuple
 
 import pytest
 
@@ -114,7 +114,6 @@ class Map:
                 for galaxy in galaxies_in_line:
                     new_galaxies.add(Coords(galaxy.x, galaxy.y + y_offset))
             else:
-                print(f"No galaxies in line {y}")
                 y_offset += expansion_factor - 1
         return y_offset, new_galaxies
 
@@ -134,7 +133,6 @@ class Map:
                 for galaxy in galaxies_in_column:
                     new_galaxies.add(Coords(galaxy.x + x_offset, galaxy.y))
             else:
-                print(f"No galaxies in column {x}")
                 x_offset += expansion_factor - 1
         return x_offset, new_galaxies
 
@@ -149,12 +147,63 @@ def part1(text: str) -> int:
 
 
 def sum_of_shortest_paths(m: Map, expansion_factor: int = 2) -> int:
-    return sum(
+    return PairwiseDistances.from_map(m).total(expansion_factor)
+
+
+@pytest.mark.parametrize("expansion_factor", [1, 2, 10, 100])
+def test_pairwise_distances(expansion_factor):
+    m = Map.from_string(EXAMPLE_IMAGE)
+    assert PairwiseDistances.from_map(m).total(expansion_factor) == sum(
         shortest_path(g1, g2)
         for g1, g2 in combinations(m.expand(expansion_factor).galaxies, 2)
     )
 
 
+def test_sum_of_pairwise_differences():
+    assert sum_of_pairwise_differences([1, 2, 4]) == 1 + 3 + 2
+    assert sum_of_pairwise_differences([5]) == 0
+
+
+class PairwiseDistances(NamedTuple):
+    """
+    The sum of distances between all pairs of galaxies, as a linear function
+    of the expansion factor.
+    """
+
+    base: int  # without expansion
+    per_expansion: int  # added for each extra copy of empty rows and columns
+
+    @classmethod
+    def from_map(cls, m: Map) -> PairwiseDistances:
+        base = per_expansion = 0
+        for values, size in [
+            ([galaxy.x for galaxy in m.galaxies], m.width),
+            ([galaxy.y for galaxy in m.galaxies], m.height),
+        ]:
+            occupied = set(values)
+            empty_before = list(
+                accumulate((i not in occupied for i in range(size)), initial=0)
+            )
+            values.sort()
+            base += sum_of_pairwise_differences(values)
+            # Expansion keeps the order, as the number of empty rows (or
+            # columns) before a galaxy only grows with its coordinate
+            per_expansion += sum_of_pairwise_differences(
+                [empty_before[value] for value in values]
+            )
+        return cls(base=base, per_expansion=per_expansion)
+
+    def total(self, expansion_factor: int) -> int:
+        return self.base + (expansion_factor - 1) * self.per_expansion
+
+
+def sum_of_pairwise_differences(sorted_values: Sequence[int]) -> int:
+    # Each value is greater than the i values before it and smaller than the
+    # n - i - 1 values after it
+    n = len(sorted_values)
+    return sum(value * (2 * i - n + 1) for i, value in enumerate(sorted_values))
+
+
 def test_part2():
     m = Map.from_string(EXAMPLE_IMAGE)
     assert sum_of_shortest_paths(m, expansion_factor=10) == 1030
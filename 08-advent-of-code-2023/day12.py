@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import cache
+from itertools import accumulate
 import re
 from typing import Iterator
 
@@ -89,6 +91,29 @@ def expand(pattern: str) -> Iterator[str]:
 def test_number_of_possible_arrangements(s, res):
     record = Record.from_string(s)
     assert record.number_of_possible_arrangements() == res
+    assert record.number_of_possible_arrangements_by_brute_force() == res
+
+
+def test_unfold():
+    assert Record.from_string(".# 1").unfold(5) == Record.from_string(
+        ".#?.#?.#?.#?.# 1,1,1,1,1"
+    )
+
+
+@pytest.mark.parametrize(
+    "s, res",
+    [
+        ("???.### 1,1,3", 1),
+        (".??..??...?##. 1,1,3", 16384),
+        ("?#?#?#?#?#?#?#? 1,3,1,6", 1),
+        ("????.#...#... 4,1,1", 16),
+        ("????.######..#####. 1,6,5", 2500),
+        ("?###???????? 3,2,1", 506250),
+    ],
+)
+def test_number_of_possible_arrangements_unfolded(s, res):
+    record = Record.from_string(s).unfold(5)
+    assert record.number_of_possible_arrangements() == res
 
 
 @dataclass(frozen=True)
@@ -101,7 +126,53 @@ class Record:
         left, right = text.split(" ")
         return cls(conditions=left, group_lengths=[int(s) for s in right.split(",")])
 
+    def unfold(self, factor: int) -> Record:
+        return Record(
+            conditions="?".join([self.conditions] * factor),
+            group_lengths=self.group_lengths * factor,
+        )
+
     def number_of_possible_arrangements(self) -> int:
+        conditions = self.conditions
+        group_lengths = self.group_lengths
+        n = len(conditions)
+
+        # Index of the first "#" at or after each position (n if there is none)
+        next_damaged = [n] * (n + 1)
+        for pos in reversed(range(n)):
+            next_damaged[pos] = pos if conditions[pos] == "#" else next_damaged[pos + 1]
+
+        # Number of "." before each position
+        operational_before = [0, *accumulate(c == "." for c in conditions)]
+
+        @cache
+        def count(pos: int, group: int) -> int:
+            """
+            Number of arrangements of conditions[pos:] matching group_lengths[group:]
+            """
+            if group == len(group_lengths):
+                return 0 if next_damaged[min(pos, n)] < n else 1
+
+            res = 0
+
+            # The spring at pos is operational
+            if pos < len(conditions) and conditions[pos] != "#":
+                res += count(pos + 1, group)
+
+            # The next group of damaged springs starts at pos
+            end = pos + group_lengths[group]
+            if (
+                end <= len(conditions)
+                and operational_before[end] == operational_before[pos]
+                and (end == len(conditions) or conditions[end] != "#")
+            ):
+                res += count(end + 1, group + 1)
+
+            return res
+
+        return count(0, 0)
+
+    def number_of_possible_arrangements_by_brute_force(self) -> int:
         regex = re.compile(self.regex())
         return ilen(
             variant for variant in expand(self.conditions) if regex.match(variant)
@@ -132,6 +203,15 @@ def part1(text: str) -> int:
     return sum(record.number_of_possible_arrangements() for record in records)
 
 
+def test_part2():
+    assert part2(EXAMPLE) == 525152
+
+
+def part2(text: str) -> int:
+    records = [Record.from_string(line).unfold(5) for line in text.splitlines() if line]
+    return sum(record.number_of_possible_arrangements() for record in records)
+
+
 def read_puzzle_input() -> str:
     with open(__file__.removesuffix("py") + "txt") as f:
         return f.read()
@@ -140,3 +220,4 @@ def read_puzzle_input() -> str:
 if __name__ == "__main__":
     puzzle_input = read_puzzle_input()
     print("Part 1", part1(puzzle_input))
+    print("Part 2", part2(puzzle_input))
@@ -1,11 +1,14 @@
 # https://adventofcode.com/2023/day/13
 from __future__ import annotations
 
-from typing import Optional
+from functools import cached_property
+from io import StringIO
+from typing import Iterable, Optional, Sequence
 
 import pytest
 
 from grid import Grid
+from inputs import read_paragraphs
 
 
 EXAMPLE_PATTERNS = """\
@@ -29,7 +32,10 @@ EXAMPLE_PATTERNS = """\
 
 @pytest.fixture
 def example_patterns():
-    return [Pattern.from_string(text) for text in EXAMPLE_PATTERNS.split("\n\n")]
+    return [
+        Pattern.from_string(text)
+        for text in read_paragraphs(StringIO(EXAMPLE_PATTERNS))
+    ]
 
 
 def test_parse_patterns(example_patterns):
@@ -46,34 +52,76 @@ def test_find_horizontal_line_symmetry(example_patterns):
     assert example_patterns[0].find_horizontal_line_symmetry() is None
 
 
+def test_bitmasks(example_patterns):
+    assert example_patterns[0].rows[0] == 0b011001101
+    assert example_patterns[0].columns[0] == 0b1001101
+
+
+@pytest.mark.parametrize(
+    "differences, vertical, horizontal",
+    [(0, [5, None], [None, 4]), (1, [None, None], [3, 1])],
+)
+def test_find_line_symmetry_with_smudges(
+    example_patterns, differences, vertical, horizontal
+):
+    assert [
+        pattern.find_vertical_line_symmetry(differences) for pattern in example_patterns
+    ] == vertical
+    assert [
+        pattern.find_horizontal_line_symmetry(differences)
+        for pattern in example_patterns
+    ] == horizontal
+
+
 class Pattern(Grid):
-    def find_vertical_line_symmetry(self) -> Optional[int]:
-        for x in range(0, self.width - 1):
-            max_width = min(x + 1, self.width - x - 1)
-            differs = False
-            for d in range(max_width):
-                for y in range(self.height):
-                    if self.at(x - d, y) != self.at(x + 1 + d, y):
-                        differs = True
-                        break
-                if differs:
-                    break
-            if differs:
-                continue
-            return x + 1  # our arrays start at zero but column numbers start at 1
-        return None
-
-    def find_horizontal_line_symmetry(self) -> Optional[int]:
-        for y in range(0, self.height - 1):
-            max_height = min(y + 1, self.height - y - 1)
-            differs = False
-            for d in range(max_height):
-                if self.lines[y - d] != self.lines[y + d + 1]:
-                    differs = True
-                    break
-            if not differs:
-                return y + 1  # our arrays start at zero but row numbers start at 1
-        return None
+    """
+    Rows and columns are encoded as bitmasks, with one bit per rock, so that
+    they can be compared (and their differences counted) as integers.
+    """
+
+    @cached_property
+    def rows(self) -> list[int]:
+        return [
+            sum(1 << x for x, char in enumerate(line) if char == "#")
+            for line in self.lines
+        ]
+
+    @cached_property
+    def columns(self) -> list[int]:
+        return [
+            sum(1 << y for y, line in enumerate(self.lines) if line[x] == "#")
+            for x in range(self.width)
+        ]
+
+    def find_vertical_line_symmetry(self, differences: int = 0) -> Optional[int]:
+        return find_line_symmetry(self.columns, differences)
+
+    def find_horizontal_line_symmetry(self, differences: int = 0) -> Optional[int]:
+        return find_line_symmetry(self.rows, differences)
+
+    def summarize(self, differences: int = 0) -> int:
+        res = 0
+        if (column := self.find_vertical_line_symmetry(differences)) is not None:
+            res += column
+        if (row := self.find_horizontal_line_symmetry(differences)) is not None:
+            res += 100 * row
+        return res
+
+
+def find_line_symmetry(lines: Sequence[int], differences: int = 0) -> Optional[int]:
+    """
+    Find the line of symmetry such that exactly the given number of bits differ
+    between the reflected lines, and return the number of lines before it.
+    """
+    for axis in range(1, len(lines)):
+        total = 0
+        for d in range(min(axis, len(lines) - axis)):
+            total += (lines[axis - 1 - d] ^ lines[axis + d]).bit_count()
+            if total > differences:
+                break
+        if total == differences:
+            return axis
+    return None
 
 
 def test_part1():
@@ -81,20 +129,27 @@ def test_part1():
 
 
 def part1(text: str) -> int:
-    res = 0
-    for pattern in (Pattern.from_string(s) for s in text.split("\n\n")):
-        if (column := pattern.find_vertical_line_symmetry()) is not None:
-            res += column
-        if (row := pattern.find_horizontal_line_symmetry()) is not None:
-            res += 100 * row
-    return res
+    return summarize_patterns(read_paragraphs(StringIO(text)), differences=0)
+
+
+def summarize_patterns(blocks: Iterable[str], differences: int = 0) -> int:
+    return sum(Pattern.from_string(block).summarize(differences) for block in blocks)
+
+
+def test_part2():
+    assert part2(EXAMPLE_PATTERNS) == 400
+
+
+def part2(text: str) -> int:
+    return summarize_patterns(read_paragraphs(StringIO(text)), differences=1)
 
 
-def read_puzzle_input() -> str:
-    with open(__file__.removesuffix("py") + "txt") as f:
-        return f.read()
+def puzzle_input_path() -> str:
+    return __file__.removesuffix("py") + "txt"
 
 
 if __name__ == "__main__":
-    puzzle_input = read_puzzle_input()
-    print("Part 1", part1(puzzle_input))
+    with open(puzzle_input_path()) as f:
+        print("Part 1", summarize_patterns(read_paragraphs(f), differences=0))
+    with open(puzzle_input_path()) as f:
+        print("Part 2", summarize_patterns(read_paragraphs(f), differences=1))
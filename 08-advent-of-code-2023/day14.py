@@ -1,14 +1,17 @@
 # https://adventofcode.com/2023/day/14
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
 from array import array
 from textwrap import dedent
-from typing import Iterator, Self, Tuple
+from typing import Hashable, Iterator, Self, Tuple
 
 import numpy as np
 
 import pytest
 
+from cycles import Cycle, find_cycle
+
 
 EXAMPLE = """\
 O....#....
@@ -120,7 +123,83 @@ def test_tilt_north(platform):
     )
 
 
-class Platform(Matrix):
+def test_incomplete_platform():
+    class TiltNorthOnly(SpinCycling):
+        def tilt_north(self) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        TiltNorthOnly()  # type: ignore[abstract]
+
+
+class SpinCycling(ABC):
+    """
+    Spin cycle logic shared by all platform implementations
+    """
+
+    @classmethod
+    @abstractmethod
+    def from_string(cls, text: str) -> Self:
+        ...
+
+    @abstractmethod
+    def tilt_north(self) -> None:
+        ...
+
+    @abstractmethod
+    def tilt_west(self) -> None:
+        ...
+
+    @abstractmethod
+    def tilt_south(self) -> None:
+        ...
+
+    @abstractmethod
+    def tilt_east(self) -> None:
+        ...
+
+    @abstractmethod
+    def copy(self) -> Self:
+        ...
+
+    @abstractmethod
+    def state(self) -> Hashable:
+        ...
+
+    @abstractmethod
+    def total_load(self) -> int:
+        ...
+
+    def spin_cycle(self) -> None:
+        self.tilt_north()
+        self.tilt_west()
+        self.tilt_south()
+        self.tilt_east()
+
+    def spun(self) -> Self:
+        platform = self.copy()
+        platform.spin_cycle()
+        return platform
+
+    def spin_cycles(self) -> Cycle[Self]:
+        # Keeping all platforms takes the fewest spins, and lets the cycle
+        # return any of them without spinning again
+        return find_cycle(
+            self.copy(),
+            step=lambda platform: platform.spun(),
+            key=lambda platform: platform.state(),
+            fingerprint=lambda platform: hash(platform.state()),
+        )
+
+    def spin_cycles_periodicity(self) -> Tuple[int, int]:
+        cycle = self.spin_cycles()
+        return cycle.start, cycle.period
+
+
+class Platform(Matrix, SpinCycling):
+    def state(self) -> Hashable:
+        return self.data.tobytes()
+
     def rounded_rocks_in_column(self, x: int) -> Iterator[int]:
         for y in range(1, self.height + 1):
             if self[x, y] == "O":
@@ -131,12 +210,6 @@ class Platform(Matrix):
             if self[x, y] == "O":
                 yield x
 
-    def spin_cycle(self) -> None:
-        self.tilt_north()
-        self.tilt_west()
-        self.tilt_south()
-        self.tilt_east()
-
     def tilt_north(self) -> None:
         self.tilt_vertically(delta=-1)
 
@@ -171,18 +244,6 @@ class Platform(Matrix):
                     target_x += delta
                 self[x, y], self[target_x, y] = self[target_x, y], self[x, y]
 
-    def spin_cycles_periodicity(self) -> Tuple[int, int]:
-        seen = {}
-        cycles = 0
-        platform = self.copy()
-        while platform.data.tobytes() not in seen:
-            if cycles > 0:
-                seen[platform.data.tobytes()] = cycles
-            platform.spin_cycle()
-            cycles += 1
-        previous = seen[platform.data.tobytes()]
-        return previous, cycles - previous
-
     def total_load(self) -> int:
         return sum(
             self.height - y + 1
@@ -191,12 +252,166 @@ class Platform(Matrix):
         )
 
 
-def test_part1():
-    assert part1(EXAMPLE) == 136
+class VectorizedPlatform(Platform):
+    """
+    Tilts the whole platform with a few array operations instead of moving
+    rounded rocks one at a time.
+    """
+
+    def tilt_vertically(self, delta: int) -> None:
+        self.data = tilt_rows(self.data.T, reverse=delta > 0).T.copy()
+
+    def tilt_horizontally(self, delta: int) -> None:
+        self.data = tilt_rows(self.data, reverse=delta > 0)
+
+    def total_load(self) -> int:
+        weights = np.arange(self.height, 0, -1)
+        return int(((self.data == "O") * weights[:, np.newaxis]).sum())
+
+
+def tilt_rows(cells: np.ndarray, reverse: bool = False) -> np.ndarray:
+    """
+    Move rounded rocks towards the start of each row (or the end if reverse).
+    """
+    if reverse:
+        cells = cells[:, ::-1]
+    height, width = cells.shape
+
+    # Put a cube-shaped rock in front of each row, so that every segment of the
+    # flattened array starts with one
+    padded = np.full((height, width + 1), "#", dtype=cells.dtype)
+    padded[:, 1:] = cells
+    flat = padded.ravel()
+
+    cubes = flat == "#"
+    segment_starts = np.flatnonzero(cubes)
+    rounded_per_segment = np.add.reduceat(flat == "O", segment_starts)
+    segment = np.cumsum(cubes) - 1
+    rank = np.arange(flat.size) - segment_starts[segment]
+
+    tilted = np.where(
+        cubes, "#", np.where(rank <= rounded_per_segment[segment], "O", ".")
+    )
+    res = tilted.reshape(height, width + 1)[:, 1:]
+    if reverse:
+        res = res[:, ::-1]
+    return res.copy()
+
+
+def test_bitboard_platform_str():
+    assert str(BitboardPlatform.from_string(EXAMPLE)) == EXAMPLE.strip()
+
+
+class BitboardPlatform(SpinCycling):
+    """
+    The whole platform is packed into two integers (one for rounded rocks and
+    one for cube-shaped rocks), with one bit per cell. Rows are stored one
+    after the other, each followed by an extra (always empty) guard column.
+    Moves are masked with board_mask, which excludes the guard columns, so
+    rocks never wrap around from one row to the next when moving sideways.
+    """
+
+    def __init__(self, width: int, height: int, rounded: int, cubes: int):
+        self.width = width
+        self.height = height
+        self.rounded = rounded
+        self.cubes = cubes
+        self.stride = width + 1
+        self.row_mask = (1 << width) - 1
+        self.board_mask = sum(self.row_mask << (y * self.stride) for y in range(height))
+
+    @classmethod
+    def from_string(cls, text: str) -> Self:
+        lines = text.strip().splitlines()
+        width = len(lines[0])
+        rounded = cubes = 0
+        for y, line in enumerate(lines):
+            for x, char in enumerate(line):
+                bit = 1 << (y * (width + 1) + x)
+                if char == "O":
+                    rounded |= bit
+                elif char == "#":
+                    cubes |= bit
+        return cls(width=width, height=len(lines), rounded=rounded, cubes=cubes)
+
+    def __str__(self) -> str:
+        return "\n".join(
+            "".join(self.at(x, y) for x in range(self.width))
+            for y in range(self.height)
+        )
+
+    def at(self, x: int, y: int) -> str:
+        bit = 1 << (y * self.stride + x)
+        if self.rounded & bit:
+            return "O"
+        if self.cubes & bit:
+            return "#"
+        return "."
+
+    def copy(self) -> Self:
+        return self.__class__(self.width, self.height, self.rounded, self.cubes)
+
+    def state(self) -> Hashable:
+        return self.rounded
+
+    def tilt(self, shift: int) -> None:
+        """
+        Move all rounded rocks one cell at a time (towards lower bits if shift
+        is positive, higher bits otherwise) until none of them can move.
+        """
+        rounded = self.rounded
+        while True:
+            free = ~(rounded | self.cubes) & self.board_mask
+            if shift > 0:
+                movable = rounded & (free << shift)
+                moved = movable >> shift
+            else:
+                movable = rounded & (free >> -shift)
+                moved = movable << -shift
+            if not movable:
+                break
+            rounded = (rounded ^ movable) | moved
+        self.rounded = rounded
+
+    def tilt_north(self) -> None:
+        self.tilt(self.stride)
+
+    def tilt_west(self) -> None:
+        self.tilt(1)
+
+    def tilt_south(self) -> None:
+        self.tilt(-self.stride)
+
+    def tilt_east(self) -> None:
+        self.tilt(-1)
+
+    def total_load(self) -> int:
+        return sum(
+            (self.height - y)
+            * ((self.rounded >> (y * self.stride)) & self.row_mask).bit_count()
+            for y in range(self.height)
+        )
+
+
+@pytest.mark.parametrize("platform_class", [VectorizedPlatform, BitboardPlatform])
+@pytest.mark.parametrize("direction", ["north", "west", "south", "east"])
+def test_platform_tilt(platform, platform_class, direction):
+    other = platform_class.from_string(EXAMPLE)
+    getattr(platform, f"tilt_{direction}")()
+    getattr(other, f"tilt_{direction}")()
+    assert str(other) == str(platform)
+    assert other.total_load() == platform.total_load()
+
+
+@pytest.mark.parametrize(
+    "platform_class", [Platform, VectorizedPlatform, BitboardPlatform]
+)
+def test_part1(platform_class):
+    assert part1(EXAMPLE, platform_class) == 136
 
 
-def part1(text: str) -> int:
-    platform = Platform.from_string(text)
+def part1(text: str, platform_class: type[SpinCycling] = Platform) -> int:
+    platform = platform_class.from_string(text)
     platform.tilt_north()
     return platform.total_load()
 
@@ -226,17 +441,25 @@ def test_find_cycles(platform):
     assert platform.spin_cycles_periodicity() == (3, 7)
 
 
-def test_part2():
-    assert part2(EXAMPLE) == 64
+def test_bitboard_platform_spin_cycle(platform):
+    bitboard = BitboardPlatform.from_string(EXAMPLE)
+    for _ in range(3):
+        platform.spin_cycle()
+        bitboard.spin_cycle()
+        assert str(bitboard) == str(platform)
+    assert BitboardPlatform.from_string(EXAMPLE).spin_cycles_periodicity() == (3, 7)
 
 
-def part2(text: str) -> int:
-    platform = Platform.from_string(text)
-    initial, periodicity = platform.spin_cycles_periodicity()
-    nb_cycles = initial + ((1_000_000_000 - initial) % periodicity)
-    for i in range(nb_cycles):
-        platform.spin_cycle()
-    return platform.total_load()
+@pytest.mark.parametrize(
+    "platform_class", [Platform, VectorizedPlatform, BitboardPlatform]
+)
+def test_part2(platform_class):
+    assert part2(EXAMPLE, platform_class) == 64
+
+
+def part2(text: str, platform_class: type[SpinCycling] = Platform) -> int:
+    platform = platform_class.from_string(text)
+    return platform.spin_cycles().state_at(1_000_000_000).total_load()
 
 
 def read_puzzle_input() -> str:
@@ -246,5 +469,5 @@ def read_puzzle_input() -> str:
 
 if __name__ == "__main__":
     puzzle_input = read_puzzle_input()
-    print("Part 1", part1(puzzle_input))
-    print("Part 2", part2(puzzle_input))
+    print("Part 1", part1(puzzle_input, BitboardPlatform))
+    print("Part 2", part2(puzzle_input, BitboardPlatform))
@@ -1,12 +1,14 @@
 # https://adventofcode.com/2023/day/16
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Literal
+from math import ceil
+from typing import Literal, Optional
 
 import pytest
 
-from grid import Coords, Grid, Direction
+from grid import ArrayGrid, Coords, Grid, Direction
 
 
 EXAMPLE = """\
@@ -158,13 +160,148 @@ class Cave:
     beams: set[Beam]
 
 
+DIRECTIONS = [Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP]
+
+# Outgoing direction indexes, for each incoming direction index
+REFLECTIONS: dict[str, list[tuple[int, ...]]] = {
+    "/": [(3,), (2,), (1,), (0,)],
+    "\\": [(1,), (0,), (3,), (2,)],
+    "|": [(1, 3), (1,), (1, 3), (3,)],
+    "-": [(0,), (0, 2), (2,), (0, 2)],
+}
+
+
+class TestContraption:
+    def test_jump_to_mirror(self, grid: Grid):
+        contraption = Contraption(grid)
+        tiles, successors = contraption.jump(contraption.state(Beam()))
+        assert tiles == 0b11
+        assert successors == (contraption.state(Beam(Coords(2, 2), Direction.DOWN)),)
+
+    def test_jump_out_of_grid(self, grid: Grid):
+        contraption = Contraption(grid)
+        tiles, successors = contraption.jump(
+            contraption.state(Beam(Coords(1, 1), Direction.DOWN))
+        )
+        assert tiles == sum(1 << (y * grid.width) for y in range(grid.height))
+        assert successors == ()
+
+    def test_number_of_activated_tiles(self, grid: Grid):
+        contraption = Contraption(grid)
+        for beam in edge_beams(grid):
+            assert contraption.number_of_activated_tiles(
+                beam
+            ) == number_of_activated_tiles(grid=grid, initial=beam)
+
+
+class Contraption:
+    """
+    Beams are encoded as integer states (tile index * 4 + direction index).
+
+    A beam entering a tile moves in a straight line until it reaches a tile
+    that changes its direction (or leaves the grid). Each such straight run is
+    computed once, as a bitmask of tiles and the states it leads to.
+
+    The energized tiles reachable from each state are cached, using Tarjan's
+    algorithm to handle loops: all the states of a strongly connected
+    component energize the same tiles.
+    """
+
+    def __init__(self, grid: Grid):
+        self.grid = grid if isinstance(grid, ArrayGrid) else ArrayGrid(grid.lines)
+        self.jumps: dict[int, tuple[int, tuple[int, ...]]] = {}
+        self.reach: dict[int, int] = {}
+
+    def state(self, beam: Beam) -> int:
+        x, y = beam.position.x - 1, beam.position.y - 1
+        return (y * self.grid.width + x) * 4 + DIRECTIONS.index(beam.direction)
+
+    def jump(self, state: int) -> tuple[int, tuple[int, ...]]:
+        if state in self.jumps:
+            return self.jumps[state]
+        grid = self.grid
+        tile, direction = divmod(state, 4)
+        offset = grid.offsets[DIRECTIONS[direction]]
+        can_move = grid.can_move[DIRECTIONS[direction]]
+        tiles = 0
+        while True:
+            tiles |= 1 << tile
+            char = chr(grid.flat[tile])
+            if char != "." and REFLECTIONS[char][direction] != (direction,):
+                break
+            if not can_move[tile]:
+                self.jumps[state] = tiles, ()
+                return self.jumps[state]
+            tile += offset
+        self.jumps[state] = tiles, tuple(
+            (tile + grid.offsets[DIRECTIONS[new_direction]]) * 4 + new_direction
+            for new_direction in REFLECTIONS[char][direction]
+            if grid.can_move[DIRECTIONS[new_direction]][tile]
+        )
+        return self.jumps[state]
+
+    def reachable_tiles(self, start: int) -> int:
+        if start in self.reach:
+            return self.reach[start]
+
+        # Iterative version of Tarjan's strongly connected components algorithm
+        index = {start: 0}
+        lowlink = {start: 0}
+        stack = [start]
+        on_stack = {start}
+        work = [(start, 0)]
+        while work:
+            state, i = work[-1]
+            successors = self.jump(state)[1]
+            if i < len(successors):
+                work[-1] = (state, i + 1)
+                successor = successors[i]
+                if successor in self.reach:
+                    continue
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, 0))
+                elif successor in on_stack:
+                    lowlink[state] = min(lowlink[state], index[successor])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[state])
+
+            if lowlink[state] == index[state]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.remove(member)
+                    component.append(member)
+                    if member == state:
+                        break
+                tiles = 0
+                for member in component:
+                    member_tiles, successors = self.jump(member)
+                    tiles |= member_tiles
+                    for successor in successors:
+                        tiles |= self.reach.get(successor, 0)
+                for member in component:
+                    self.reach[member] = tiles
+
+        return self.reach[start]
+
+    def number_of_activated_tiles(self, beam: Beam) -> int:
+        return self.reachable_tiles(self.state(beam)).bit_count()
+
+
 def test_part1():
     assert part1(EXAMPLE) == 46
 
 
 def part1(text: str) -> int:
     grid = Grid.from_string(text)
-    return number_of_activated_tiles(grid=grid, initial=Beam())
+    return Contraption(grid).number_of_activated_tiles(Beam())
 
 
 def number_of_activated_tiles(grid: Grid, initial: Beam) -> int:
@@ -180,12 +317,46 @@ def number_of_activated_tiles(grid: Grid, initial: Beam) -> int:
     return len(activated)
 
 
-def test_part2():
-    assert part2(EXAMPLE) == 51
+@pytest.mark.parametrize("workers", [1, 2])
+def test_part2(workers):
+    assert part2(EXAMPLE, workers=workers) == 51
 
 
-def part2(text: str) -> int:
+def part2(text: str, workers: int = 1) -> int:
     grid = Grid.from_string(text)
+    beams = edge_beams(grid)
+    if workers == 1:
+        contraption = Contraption(grid)
+        return max(contraption.number_of_activated_tiles(beam) for beam in beams)
+
+    # Each worker process builds its own contraption once, and gets a share of
+    # the beams
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(grid,)
+    ) as executor:
+        return max(
+            executor.map(
+                worker_number_of_activated_tiles,
+                beams,
+                chunksize=ceil(len(beams) / workers),
+            )
+        )
+
+
+worker_contraption: Optional[Contraption] = None
+
+
+def init_worker(grid: Grid) -> None:
+    global worker_contraption
+    worker_contraption = Contraption(grid)
+
+
+def worker_number_of_activated_tiles(beam: Beam) -> int:
+    assert worker_contraption is not None
+    return worker_contraption.number_of_activated_tiles(beam)
+
+
+def edge_beams(grid: Grid) -> list[Beam]:
     top_beams = [
         Beam(position=Coords(x, 1), direction=Direction.DOWN)
         for x in range(1, grid.width + 1)
@@ -202,8 +373,7 @@ def part2(text: str) -> int:
         Beam(position=Coords(grid.width, y), direction=Direction.LEFT)
         for y in range(1, grid.height + 1)
     ]
-    beams = top_beams + bottom_beams + left_beams + right_beams
-    return max(number_of_activated_tiles(grid=grid, initial=beam) for beam in beams)
+    return top_beams + bottom_beams + left_beams + right_beams
 
 
 def read_puzzle_input() -> str:
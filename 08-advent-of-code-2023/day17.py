@@ -1,7 +1,8 @@
 # https://adventofcode.com/2023/day/17
 from __future__ import annotations
 
-from typing import NamedTuple, Self
+from heapq import heappop, heappush
+from typing import Iterable, NamedTuple, Optional, Self
 
 import networkx as nx
 
@@ -112,13 +113,142 @@ class Graph(nx.DiGraph):
         )
 
 
+@pytest.mark.parametrize("min_dist, max_dist", [(1, 3), (4, 10)])
+@pytest.mark.parametrize("heuristic", [False, True])
+def test_heat_loss_solver(grid, min_dist, max_dist, heuristic):
+    solver = HeatLossSolver(grid, min_dist=min_dist, max_dist=max_dist)
+    graph = Graph.from_string(EXAMPLE, min_dist=min_dist, max_dist=max_dist)
+    assert solver.minimum_heat_loss(heuristic=heuristic) == graph.minimum_heat_loss()
+
+
+def test_heat_loss_solver_multiple_sources_and_targets(grid):
+    solver = HeatLossSolver(grid)
+    assert solver.minimum_heat_loss(sources=[Coords(0, 0)], targets=[Coords(1, 0)]) == 4
+    assert (
+        solver.minimum_heat_loss(
+            sources=[Coords(0, 0), Coords(12, 12)],
+            targets=[Coords(12, 12), Coords(6, 6)],
+        )
+        == 0
+    )
+
+
+class HeatLossSolver:
+    """
+    Dijkstra's algorithm (or A* with a Manhattan distance heuristic) on the
+    implicit graph of (position, orientation) states, where the orientation
+    is the one of the next move.
+
+    Edge weights are computed in constant time from the prefix sums of the heat
+    loss along each row and column of the grid.
+    """
+
+    def __init__(self, grid: Grid, min_dist: int = 1, max_dist: int = 3) -> None:
+        self.width = grid.width
+        self.height = grid.height
+        self.min_dist = min_dist
+        self.max_dist = max_dist
+        self.min_cell = int(grid.numbers.min())
+        self.row_sums = grid.row_sums.tolist()
+        self.column_sums = grid.column_sums.T.tolist()
+
+    def moves(self, x: int, y: int, orientation: int) -> Iterable[tuple[int, int, int]]:
+        """
+        Yield (x, y, heat loss) for all positions reachable from (x, y)
+        """
+        if orientation == Orientation.HORIZONTAL.value:
+            sums, position, size = self.row_sums[y], x, self.width
+        else:
+            sums, position, size = self.column_sums[x], y, self.height
+        for length in range(self.min_dist, self.max_dist + 1):
+            forward = position + length
+            if forward < size:
+                heat_loss = sums[forward + 1] - sums[position + 1]
+                if orientation == Orientation.HORIZONTAL.value:
+                    yield forward, y, heat_loss
+                else:
+                    yield x, forward, heat_loss
+            backward = position - length
+            if backward >= 0:
+                heat_loss = sums[position] - sums[backward]
+                if orientation == Orientation.HORIZONTAL.value:
+                    yield backward, y, heat_loss
+                else:
+                    yield x, backward, heat_loss
+
+    def minimum_heat_loss(
+        self,
+        sources: Optional[Iterable[Coords]] = None,
+        targets: Optional[Iterable[Coords]] = None,
+        heuristic: bool = False,
+    ) -> int:
+        if sources is None:
+            sources = [Coords(0, 0)]
+        if targets is None:
+            targets = [Coords(self.width - 1, self.height - 1)]
+        target_set = set(targets)
+
+        def estimate(x: int, y: int) -> int:
+            if not heuristic:
+                return 0
+            return self.min_cell * min(
+                abs(target.x - x) + abs(target.y - y) for target in target_set
+            )
+
+        # States are encoded as (y * width + x) * 2 + orientation
+        best: list[Optional[int]] = [None] * (self.width * self.height * 2)
+        queue: list[tuple[int, int, int, int, int]] = []
+        for source in set(sources):
+            for source_orientation in Orientation:
+                state = (
+                    source.y * self.width + source.x
+                ) * 2 + source_orientation.value
+                best[state] = 0
+                heappush(
+                    queue,
+                    (
+                        estimate(source.x, source.y),
+                        0,
+                        source.x,
+                        source.y,
+                        source_orientation.value,
+                    ),
+                )
+
+        while queue:
+            _, heat_loss, x, y, orientation = heappop(queue)
+            if Coords(x, y) in target_set:
+                return heat_loss
+            best_heat_loss = best[(y * self.width + x) * 2 + orientation]
+            if best_heat_loss is not None and heat_loss > best_heat_loss:
+                continue
+            next_orientation = 1 - orientation
+            for next_x, next_y, delta in self.moves(x, y, orientation):
+                next_heat_loss = heat_loss + delta
+                next_state = (next_y * self.width + next_x) * 2 + next_orientation
+                previous = best[next_state]
+                if previous is None or next_heat_loss < previous:
+                    best[next_state] = next_heat_loss
+                    heappush(
+                        queue,
+                        (
+                            next_heat_loss + estimate(next_x, next_y),
+                            next_heat_loss,
+                            next_x,
+                            next_y,
+                            next_orientation,
+                        ),
+                    )
+        raise ValueError("No path to any target")
+
+
 def test_part1():
     assert part1(EXAMPLE) == 102
 
 
 def part1(text: str) -> int:
-    graph = Graph.from_string(text)
-    return graph.minimum_heat_loss()
+    solver = HeatLossSolver(Grid.from_string(text))
+    return solver.minimum_heat_loss(heuristic=True)
 
 
 def test_part2():
@@ -139,8 +269,8 @@ def test_part2_other_example():
 
 
 def part2(text: str) -> int:
-    graph = Graph.from_string(text, min_dist=4, max_dist=10)
-    return graph.minimum_heat_loss()
+    solver = HeatLossSolver(Grid.from_string(text), min_dist=4, max_dist=10)
+    return solver.minimum_heat_loss(heuristic=True)
 
 
 def read_puzzle_input() -> str:
@@ -3,7 +3,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
 from functools import cached_property
-from typing import Any, NamedTuple, Self
+from typing import Any, Iterator, NamedTuple, Optional, Self
+
+import numpy as np
 
 
 class Coords(NamedTuple):
@@ -47,6 +49,22 @@ class Orientation(Enum):
         return str(self)
 
 
+def test_segment_sum():
+    grid = Grid.from_string("123\n456\n789")
+    assert grid.segment_sum(Orientation.HORIZONTAL, 1, 0, 3) == 15
+    assert grid.segment_sum(Orientation.HORIZONTAL, 2, 1, 2) == 8
+    assert grid.segment_sum(Orientation.VERTICAL, 0, 0, 3) == 12
+    assert grid.segment_sum(Orientation.VERTICAL, 2, 1, 3) == 15
+
+
+def test_rect_sum():
+    grid = Grid.from_string("123\n456\n789")
+    assert grid.rect_sum(0, 0, 3, 3) == 45
+    assert grid.rect_sum(1, 1, 3, 3) == 28
+    assert grid.rect_sum(0, 1, 2, 2) == 9
+    assert grid.rect_sum(1, 1, 1, 3) == 0
+
+
 @dataclass(frozen=True)
 class Grid:
     lines: list[str]
@@ -66,5 +84,138 @@ class Grid:
     def at(self, x: int, y: int) -> str:
         return self.lines[y][x]
 
+    @cached_property
+    def numbers(self) -> np.ndarray:
+        return np.array([[int(c) for c in line] for line in self.lines], dtype=np.int64)
+
+    @cached_property
+    def row_sums(self) -> np.ndarray:
+        """
+        row_sums[y, x] is the sum of the first x numbers of row y
+        """
+        res = np.zeros((self.height, self.width + 1), dtype=np.int64)
+        np.cumsum(self.numbers, axis=1, out=res[:, 1:])
+        return res
+
+    @cached_property
+    def column_sums(self) -> np.ndarray:
+        """
+        column_sums[y, x] is the sum of the first y numbers of column x
+        """
+        res = np.zeros((self.height + 1, self.width), dtype=np.int64)
+        np.cumsum(self.numbers, axis=0, out=res[1:, :])
+        return res
+
+    @cached_property
+    def summed_area(self) -> np.ndarray:
+        """
+        summed_area[y, x] is the sum of the numbers above and to the left of (x, y)
+        """
+        res = np.zeros((self.height + 1, self.width + 1), dtype=np.int64)
+        np.cumsum(self.row_sums[:, 1:], axis=0, out=res[1:, 1:])
+        return res
+
+    def segment_sum(
+        self, orientation: Orientation, index: int, start: int, end: int
+    ) -> int:
+        """
+        Sum of numbers from start (inclusive) to end (exclusive) in a row or column
+        """
+        match orientation:
+            case Orientation.HORIZONTAL:
+                return int(self.row_sums[index, end] - self.row_sums[index, start])
+            case Orientation.VERTICAL:
+                return int(
+                    self.column_sums[end, index] - self.column_sums[start, index]
+                )
+
+    def rect_sum(self, x0: int, y0: int, x1: int, y1: int) -> int:
+        """
+        Sum of numbers in [x0, x1) x [y0, y1)
+        """
+        s = self.summed_area
+        return int(s[y1, x1] - s[y0, x1] - s[y1, x0] + s[y0, x0])
+
     def __str__(self):
         return "\n".join(self.lines)
+
+
+def test_array_grid():
+    grid = ArrayGrid.from_string("abc\ndef")
+    assert grid.width == 3
+    assert grid.height == 2
+    assert grid.at(2, 1) == "f"
+    assert grid.cells[1, 2] == ord("f")
+    assert grid.index(2, 1) == 5
+    assert grid.coords(5) == Coords(2, 1)
+    assert grid.neighbor(0, Direction.LEFT) is None
+    assert grid.neighbor(0, Direction.DOWN) == 3
+    assert list(grid.neighbors(4)) == [
+        (Direction.LEFT, 3),
+        (Direction.RIGHT, 5),
+        (Direction.UP, 1),
+    ]
+
+
+@dataclass(frozen=True)
+class ArrayGrid(Grid):
+    """
+    Grid backed by a flat array of bytes, for solvers that encode positions as
+    integer indexes (y * width + x) in their hot loops.
+    """
+
+    @cached_property
+    def flat(self) -> bytes:
+        return "".join(self.lines).encode()
+
+    @cached_property
+    def cells(self) -> np.ndarray:
+        return np.frombuffer(self.flat, dtype=np.uint8).reshape(self.height, self.width)
+
+    def at(self, x: int, y: int) -> str:
+        return chr(self.flat[y * self.width + x])
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def coords(self, index: int) -> Coords:
+        y, x = divmod(index, self.width)
+        return Coords(x, y)
+
+    @cached_property
+    def offsets(self) -> dict[Direction, int]:
+        return {
+            direction: direction.value.y * self.width + direction.value.x
+            for direction in Direction
+        }
+
+    @cached_property
+    def can_move(self) -> dict[Direction, bytes]:
+        """
+        can_move[direction][index] is 1 if the neighbor of index in that
+        direction is in the grid, 0 otherwise
+        """
+        res = {}
+        for direction in Direction:
+            mask = np.ones((self.height, self.width), dtype=np.uint8)
+            match direction:
+                case Direction.LEFT:
+                    mask[:, 0] = 0
+                case Direction.RIGHT:
+                    mask[:, -1] = 0
+                case Direction.UP:
+                    mask[0, :] = 0
+                case Direction.DOWN:
+                    mask[-1, :] = 0
+            res[direction] = mask.tobytes()
+        return res
+
+    def neighbor(self, index: int, direction: Direction) -> Optional[int]:
+        if self.can_move[direction][index]:
+            return index + self.offsets[direction]
+        return None
+
+    def neighbors(self, index: int) -> Iterator[tuple[Direction, int]]:
+        for direction in Direction:
+            if self.can_move[direction][index]:
+                yield direction, index + self.offsets[direction]
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from io import StringIO
+from typing import Iterable, Iterator
+
+
+def test_read_paragraphs():
+    text = "a\nb\n\nc\n\n\nd"
+    assert list(read_paragraphs(StringIO(text))) == ["a\nb\n", "c\n", "d"]
+    assert list(read_paragraphs(StringIO(""))) == []
+
+
+def read_paragraphs(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Lazily yield blank-line separated blocks of text from an iterable of lines
+    (such as an open file), so that only one block is held in memory.
+    """
+    paragraph: list[str] = []
+    for line in lines:
+        if line.strip():
+            paragraph.append(line)
+        elif paragraph:
+            yield "".join(paragraph)
+            paragraph = []
+    if paragraph:
+        yield "".join(paragraph)